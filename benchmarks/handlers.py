@@ -0,0 +1,174 @@
+"""
+Нагрузочный бенчмарк обработчиков.
+
+Синтетические апдейты основных сценариев проходят через dp.feed_update с теми же
+middleware и роутерами, что и в боте. Bot API подменён MockSession, база — та,
+что указана в DATABASE_URL: запускайте только на локальной базе. Пользователи
+бенчмарка создаются в отдельном диапазоне id и удаляются в конце.
+
+    python -m benchmarks.handlers --users 20 --iterations 10
+"""
+import argparse
+import asyncio
+import math
+import sys
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List
+
+from aiogram import Bot
+from aiogram.types import Update
+from loguru import logger
+from sqlalchemy import delete
+from telegram_calendar import CalendarCallback
+
+from benchmarks.mock_session import MockSession
+from benchmarks.updates import callback_update, message_update
+from bot import dp
+from config.main_conf import settings
+from crud.exercise import create_exercise
+from crud.user import add_user
+from database.init_db import create_tables_and_exercises
+from database.session import AsyncSessionLocal, engine
+from main import setup_dispatcher
+from middlewares.database import CommitBeforeRequestMiddleware
+from models.user import User
+
+# Id пользователей бенчмарка: в пределах INTEGER и далеко от настоящих
+BENCH_USER_BASE = 2_100_000_000
+# Своих упражнений у каждого пользователя — чтобы было что листать
+CUSTOM_EXERCISES = 12
+
+
+class Runner:
+    def __init__(self, bot: Bot, session: MockSession):
+        self.bot = bot
+        self.session = session
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def feed(self, step: str, update: Update) -> None:
+        started = time.perf_counter()
+        try:
+            await dp.feed_update(self.bot, update)
+        except Exception as e:
+            self.errors[step] += 1
+            logger.error("{}: {!r}", step, e)
+        self.latencies[step].append(time.perf_counter() - started)
+
+    # --- Сценарии
+
+    async def start(self, user_id: int) -> None:
+        await self.feed("start", message_update(user_id, "/start"))
+
+    async def exercises(self, user_id: int) -> None:
+        await self.feed("start_exercise_flow", message_update(user_id, "/exercises"))
+        await self.feed("chosen_type", callback_update(user_id, "exercise_type_strength"))
+        # Листаем вперёд до конца списка; предел — на случай зацикленной пагинации
+        for _ in range(100):
+            data = self.session.find_button(user_id, "exercises_page_a")
+            if data is None:
+                break
+            await self.feed("paginate", callback_update(user_id, data))
+
+    async def calendar(self, user_id: int, today: date) -> None:
+        await self.feed("workouts_calendar", message_update(user_id, "/workouts"))
+        for shift in range(3):
+            month = (today.month - 1 - shift) % 12 + 1
+            year = today.year - (1 if month > today.month else 0)
+            data = CalendarCallback(action="select_month", year=year, month=month, day=0).pack()
+            await self.feed("process_calendar_selection", callback_update(user_id, data))
+
+    async def log_sets(self, user_id: int, day: date) -> None:
+        data = CalendarCallback(action="select_day", year=day.year, month=day.month, day=day.day).pack()
+        await self.feed("process_calendar_selection", callback_update(user_id, data))
+        await self.feed("add_exercise_inline", callback_update(user_id, "add_exercise"))
+        await self.feed("choose_exercise_type", callback_update(user_id, "workout_type_STRENGTH"))
+        exercise = self.session.find_button(user_id, "workout_add_exercise_")
+        if exercise is None:
+            # Клавиатура без упражнений — считаем ошибкой предыдущего шага
+            self.errors["choose_exercise_type"] += 1
+            return
+        await self.feed("add_exercise_to_workout", callback_update(user_id, exercise))
+        await self.feed("enter_sets", message_update(user_id, "60 10\n70 8\n80 6"))
+
+    async def user_session(self, user_id: int, iterations: int) -> None:
+        today = date.today()
+        for i in range(iterations):
+            await self.start(user_id)
+            await self.exercises(user_id)
+            await self.calendar(user_id, today)
+            await self.log_sets(user_id, today - timedelta(days=i))
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def report(runner: Runner, elapsed: float) -> None:
+    total = sum(len(values) for values in runner.latencies.values())
+    print(f"\nАпдейтов: {total} за {elapsed:.2f} с — {total / elapsed:.1f} апдейт/с")
+    print(f"Вызовы Bot API: {dict(runner.session.calls)}\n")
+    header = f"{'обработчик':<28}{'n':>7}{'ошибки':>8}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}"
+    print(header)
+    print("-" * len(header))
+    for step, values in sorted(runner.latencies.items()):
+        print(
+            f"{step:<28}{len(values):>7}{runner.errors.get(step, 0):>8}"
+            f"{percentile(values, 50) * 1000:>10.2f}"
+            f"{percentile(values, 95) * 1000:>10.2f}"
+            f"{percentile(values, 99) * 1000:>10.2f}"
+        )
+
+
+async def prepare_users(user_ids: List[int]) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(User).where(User.id.in_(user_ids)))
+        for user_id in user_ids:
+            await add_user(session, user_id, f"bench{user_id}", "Bench")
+            for n in range(CUSTOM_EXERCISES):
+                await create_exercise(session, f"Bench {n:02d}", "", "strength", user_id)
+        await session.commit()
+
+
+async def cleanup_users(user_ids: List[int]) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(User).where(User.id.in_(user_ids)))
+        await session.commit()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк обработчиков бота")
+    parser.add_argument("--users", type=int, default=10, help="одновременных пользователей")
+    parser.add_argument("--iterations", type=int, default=5, help="повторов сценариев на пользователя")
+    parser.add_argument("--keep", action="store_true", help="не удалять пользователей бенчмарка")
+    args = parser.parse_args()
+
+    # Логи обработчиков на каждый апдейт искажают замеры
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    await create_tables_and_exercises()
+    user_ids = [BENCH_USER_BASE + i for i in range(args.users)]
+    await prepare_users(user_ids)
+
+    setup_dispatcher()
+    session = MockSession()
+    session.middleware(CommitBeforeRequestMiddleware())
+    bot = Bot(token=settings.tg.bot_token.get_secret_value(), session=session)
+    runner = Runner(bot, session)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(runner.user_session(user_id, args.iterations) for user_id in user_ids))
+        report(runner, time.perf_counter() - started)
+    finally:
+        if not args.keep:
+            await cleanup_users(user_ids)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
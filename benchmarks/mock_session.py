@@ -0,0 +1,65 @@
+from collections import Counter
+from datetime import datetime
+from typing import Any, AsyncGenerator, Dict, Optional
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import AnswerCallbackQuery, EditMessageReplyMarkup, EditMessageText, SendMessage, TelegramMethod
+from aiogram.types import Chat, InlineKeyboardMarkup, Message
+
+
+class MockSession(BaseSession):
+    """
+    Сессия Bot API без сети: запросы не отправляются, ответы собираются на месте.
+    Запоминает последнюю inline-клавиатуру в каждом чате, чтобы сценарии
+    бенчмарка нажимали те же кнопки, что и пользователь.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.calls: Counter = Counter()
+        self.keyboards: Dict[int, InlineKeyboardMarkup] = {}
+        self._message_id = 0
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[Any], timeout: Optional[int] = None) -> Any:
+        self.calls[type(method).__name__] += 1
+        if isinstance(method, (SendMessage, EditMessageText, EditMessageReplyMarkup)):
+            return self._message(method)
+        if isinstance(method, AnswerCallbackQuery):
+            return True
+        return True
+
+    def _message(self, method: Any) -> Message:
+        markup = method.reply_markup if isinstance(method.reply_markup, InlineKeyboardMarkup) else None
+        if markup is not None:
+            self.keyboards[method.chat_id] = markup
+        else:
+            # Без inline-клавиатуры прежние кнопки пользователю больше не видны
+            self.keyboards.pop(method.chat_id, None)
+        self._message_id += 1
+        return Message(
+            message_id=getattr(method, "message_id", None) or self._message_id,
+            date=datetime.now(),
+            chat=Chat(id=method.chat_id, type="private"),
+            text=getattr(method, "text", None),
+            reply_markup=markup,
+        )
+
+    def find_button(self, chat_id: int, prefix: str) -> Optional[str]:
+        # callback_data первой кнопки последней клавиатуры чата с заданным префиксом
+        markup = self.keyboards.get(chat_id)
+        if markup is None:
+            return None
+        for row in markup.inline_keyboard:
+            for button in row:
+                if button.callback_data and button.callback_data.startswith(prefix):
+                    return button.callback_data
+        return None
+
+    async def stream_content(self, url: str, headers: Optional[Dict[str, Any]] = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        # Файлы в сценариях бенчмарка не скачиваются: пустой поток
+        return
+        yield
+
+    async def close(self) -> None:
+        pass
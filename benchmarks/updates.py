@@ -0,0 +1,39 @@
+import itertools
+from datetime import datetime
+from typing import Optional
+from aiogram.types import Update
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": "Bench", "username": f"bench{user_id}"}
+
+
+def _message(user_id: int, text: str) -> dict:
+    return {
+        "message_id": next(_message_ids),
+        "date": int(datetime.now().timestamp()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": _user(user_id),
+        "text": text,
+    }
+
+
+def message_update(user_id: int, text: str) -> Update:
+    return Update.model_validate({"update_id": next(_update_ids), "message": _message(user_id, text)})
+
+
+def callback_update(user_id: int, data: str, message_text: Optional[str] = "Бенчмарк") -> Update:
+    # Сообщение с кнопкой нужно обработчикам, которые его редактируют
+    return Update.model_validate({
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "from": _user(user_id),
+            "chat_instance": str(user_id),
+            "message": _message(user_id, message_text),
+            "data": data,
+        },
+    })
@@ -1,14 +1,36 @@
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
+from client.session import RateLimitedSession
+from middlewares.scheduler import UpdateScheduler
 from config.main_conf import settings
+from storage.memory import ShardedMemoryStorage
 
 
 bot = Bot(
     token = settings.tg.bot_token.get_secret_value(),
+    session=RateLimitedSession(
+        global_rate=settings.tg.api_global_rate,
+        global_burst=settings.tg.api_global_burst,
+        chat_rate=settings.tg.api_chat_rate,
+        chat_burst=settings.tg.api_chat_burst,
+        group_rate=settings.tg.api_group_rate,
+        max_retries=settings.tg.api_max_retries,
+        max_retry_after=settings.tg.api_max_retry_after,
+    ),
     default=DefaultBotProperties(parse_mode=ParseMode.HTML)
 )
 
-dp = Dispatcher(storage=MemoryStorage())
+storage = ShardedMemoryStorage(
+    max_keys=settings.fsm.fsm_max_keys,
+    shards=settings.fsm.fsm_shards,
+    ttl=settings.fsm.fsm_ttl,
+    snapshot_path=settings.fsm.fsm_snapshot_path or None,
+    snapshot_interval=settings.fsm.fsm_snapshot_interval,
+)
+
+# Очередь апдейтов по чатам: состояние FSM читается уже внутри неё
+scheduler = UpdateScheduler(settings.tg.update_concurrency)
+
+dp = Dispatcher(storage=storage, events_isolation=scheduler)
 
@@ -0,0 +1,164 @@
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cache.lru import LRUCache
+from models.exercise import Exercise
+from models.exercise_type import ExerciseType
+
+# Пользователей с большим числом своих упражнений не кэшируем — для них
+# страницы читаются из БД, как раньше
+MAX_USER_EXERCISES = 500
+
+
+@dataclass(frozen=True)
+class CatalogExercise:
+    """
+    Неизменяемый снимок упражнения: не привязан к сессии и безопасно
+    переживает её закрытие. Атрибуты совпадают с моделью Exercise.
+    """
+    id: int
+    name: str
+    type: ExerciseType
+    is_default: bool
+    user_id: Optional[int]
+
+    @classmethod
+    def from_model(cls, exercise: Exercise) -> "CatalogExercise":
+        return cls(exercise.id, exercise.name, exercise.type, exercise.is_default, exercise.user_id)
+
+
+def _sort_key(exercise: CatalogExercise) -> Tuple[str, int]:
+    return exercise.name, exercise.id
+
+
+class SortedExercises:
+    """
+    Упражнения одного типа в порядке (name, id) вместе с ключами сортировки:
+    страница по курсору — поиск ключа опорного упражнения и bisect, без
+    пересортировки и перебора списка.
+    """
+    __slots__ = ("items", "keys", "key_of")
+
+    def __init__(self, exercises: Iterable[CatalogExercise]):
+        self.items: List[CatalogExercise] = sorted(exercises, key=_sort_key)
+        self.keys: List[Tuple[str, int]] = [_sort_key(ex) for ex in self.items]
+        self.key_of: Dict[int, Tuple[str, int]] = dict(zip((ex.id for ex in self.items), self.keys))
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+_EMPTY = SortedExercises(())
+
+
+class _UserCatalog:
+    # Упражнения по умолчанию и свои упражнения пользователя, уже слитые и отсортированные по типам
+    __slots__ = ("by_id", "by_type")
+
+    def __init__(self, defaults: Dict[int, CatalogExercise], own: Iterable[CatalogExercise]):
+        self.by_id: Dict[int, CatalogExercise] = {**defaults, **{ex.id: ex for ex in own}}
+        grouped: Dict[ExerciseType, List[CatalogExercise]] = {}
+        for ex in self.by_id.values():
+            grouped.setdefault(ex.type, []).append(ex)
+        self.by_type = {exercise_type: SortedExercises(items) for exercise_type, items in grouped.items()}
+
+
+# Упражнения по умолчанию не меняются, поэтому загружаются один раз
+_defaults: Optional[Dict[int, CatalogExercise]] = None
+# user_id -> каталог пользователя; None — своих упражнений слишком много для кэша.
+# Каталоги включают упражнения по умолчанию, поэтому сбрасываются вместе с ними.
+_users = LRUCache(maxsize=10_000)
+
+
+def has_defaults() -> bool:
+    return _defaults is not None
+
+
+def get_defaults() -> Optional[Dict[int, CatalogExercise]]:
+    return _defaults
+
+
+def set_defaults(exercises: Iterable[CatalogExercise]) -> Dict[int, CatalogExercise]:
+    global _defaults
+    _defaults = {ex.id: ex for ex in exercises}
+    return _defaults
+
+
+def has_user(user_id: int) -> bool:
+    return user_id in _users
+
+
+def set_user(
+    user_id: int,
+    exercises: Optional[Iterable[CatalogExercise]],
+    defaults: Dict[int, CatalogExercise],
+) -> None:
+    # Упражнения по умолчанию передаются явно: между загрузкой и этим вызовом
+    # модульный _defaults мог быть сброшен
+    _users.set(user_id, _UserCatalog(defaults, exercises) if exercises is not None else None)
+
+
+def is_user_cached(user_id: int) -> bool:
+    # Каталог пользователя целиком в памяти: и упражнения по умолчанию, и свои
+    return _defaults is not None and _users.get(user_id) is not None
+
+
+def get_exercise(user_id: int, exercise_id: int) -> Optional[CatalogExercise]:
+    if _defaults is not None and exercise_id in _defaults:
+        return _defaults[exercise_id]
+    catalog = _users.get(user_id)
+    if catalog is not None:
+        return catalog.by_id.get(exercise_id)
+    return None
+
+
+def get_exercises(user_id: int, exercise_type: ExerciseType) -> SortedExercises:
+    """
+    Упражнения типа, доступные пользователю, в порядке (name, id).
+    Вызывать только если is_user_cached(user_id).
+    """
+    return _users.get(user_id).by_type.get(exercise_type, _EMPTY)
+
+
+def page_after(
+    exercises: SortedExercises, anchor_id: Optional[int], page_size: int
+) -> Tuple[List[CatalogExercise], bool]:
+    """
+    Страница после опорного упражнения (или первая, если anchor_id не задан)
+    и признак того, что дальше есть ещё упражнения.
+    """
+    start = 0
+    if anchor_id is not None:
+        anchor = exercises.key_of.get(anchor_id)
+        if anchor is None:
+            return [], False
+        start = bisect_right(exercises.keys, anchor)
+    page = exercises.items[start:start + page_size]
+    return page, start + page_size < len(exercises)
+
+
+def page_before(
+    exercises: SortedExercises, anchor_id: int, page_size: int
+) -> Tuple[List[CatalogExercise], bool]:
+    # Страница перед опорным упражнением и признак того, что перед ней есть ещё
+    anchor = exercises.key_of.get(anchor_id)
+    if anchor is None:
+        return [], False
+    end = bisect_left(exercises.keys, anchor)
+    start = max(0, end - page_size)
+    return exercises.items[start:end], start > 0
+
+
+def forget_user(user_id: int) -> None:
+    _users.pop(user_id)
+
+
+def forget_defaults() -> None:
+    global _defaults
+    _defaults = None
+    _users.clear()
+
+
+def get_cache_stats() -> Dict[str, int]:
+    return {"hits": _users.hits, "misses": _users.misses, "size": len(_users)}
@@ -0,0 +1,19 @@
+from typing import Optional
+
+from cache.lru import LRUCache
+
+# user_id -> (username, full_name), какими они записаны в БД.
+# Пользователь из кэша с теми же данными повторно не регистрируется.
+_users = LRUCache(maxsize=100_000)
+
+
+def is_known(user_id: int, username: Optional[str], full_name: Optional[str]) -> bool:
+    return _users.get(user_id) == (username, full_name)
+
+
+def remember(user_id: int, username: Optional[str], full_name: Optional[str]) -> None:
+    _users.set(user_id, (username, full_name))
+
+
+def forget(user_id: int) -> None:
+    _users.pop(user_id)
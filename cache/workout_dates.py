@@ -0,0 +1,56 @@
+import calendar
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cache.lru import LRUCache
+
+# user_id -> {(год, месяц): битовая маска дней с тренировками}
+# Бит (день - 1) выставлен, если в этот день есть тренировка.
+_user_months = LRUCache(maxsize=10_000)
+
+
+def dates_to_mask(dates: Iterable[date]) -> int:
+    mask = 0
+    for d in dates:
+        mask |= 1 << (d.day - 1)
+    return mask
+
+
+def mask_to_dates(year: int, month: int, mask: int) -> List[date]:
+    days_in_month = calendar.monthrange(year, month)[1]
+    return [date(year, month, day) for day in range(1, days_in_month + 1) if mask >> (day - 1) & 1]
+
+
+def get_month_mask(user_id: int, year: int, month: int) -> Optional[int]:
+    months: Optional[Dict[Tuple[int, int], int]] = _user_months.get(user_id)
+    if months is None:
+        return None
+    return months.get((year, month))
+
+
+def set_month_mask(user_id: int, year: int, month: int, mask: int) -> None:
+    months = _user_months.get(user_id)
+    if months is None:
+        months = {}
+        _user_months.set(user_id, months)
+    months[(year, month)] = mask
+
+
+def mark_date(user_id: int, day: date) -> None:
+    """
+    Отмечает день в уже закэшированном месяце. Незагруженные месяцы не трогаем —
+    они будут прочитаны из БД целиком при первом показе.
+    """
+    mask = get_month_mask(user_id, day.year, day.month)
+    if mask is not None:
+        set_month_mask(user_id, day.year, day.month, mask | 1 << (day.day - 1))
+
+
+def forget_month(user_id: int, year: int, month: int) -> None:
+    months = _user_months.get(user_id)
+    if months is not None:
+        months.pop((year, month), None)
+
+
+def forget_user(user_id: int) -> None:
+    _user_months.pop(user_id)
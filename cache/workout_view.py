@@ -0,0 +1,54 @@
+from datetime import date
+from typing import Dict, List, Optional
+
+from cache.exercise_catalog import CatalogExercise
+from crud.workout import LoggedSets
+from models.exercise import Exercise
+
+
+def apply_logged_sets(
+    view: Optional[Dict],
+    logged: LoggedSets,
+    user_id: int,
+    day: date,
+    exercise: Exercise | CatalogExercise,
+    reps: List[Dict],
+) -> Optional[Dict]:
+    """
+    Дописывает в представление тренировки (формат get_workout_details, хранится
+    в данных FSM под ключом workout_view) только что записанные подходы.
+    Возвращает None, если представление отсутствует или устарело: тренировку
+    успели изменить в обход него, и её нужно перечитать из БД.
+    """
+    if logged.created:
+        view = {
+            "id": logged.workout_id,
+            "date": day,
+            "user_id": user_id,
+            "note": None,
+            "version": logged.version,
+            "exercises": [],
+        }
+    elif view is None or view["id"] != logged.workout_id or view["version"] != logged.version - 1:
+        return None
+
+    entry = next(
+        (ex for ex in view["exercises"] if ex["workout_exercise_id"] == logged.workout_exercise_id),
+        None
+    )
+    if entry is None:
+        entry = {
+            "workout_exercise_id": logged.workout_exercise_id,
+            "id": exercise.id,
+            "name": exercise.name,
+            "type": exercise.type.value,
+            "reps": [],
+        }
+        view["exercises"].append(entry)
+
+    entry["reps"].extend(
+        {"weight": rep.get("weight"), "count": rep.get("count"), "duration": rep.get("duration")}
+        for rep in reps
+    )
+    view["version"] = logged.version
+    return view
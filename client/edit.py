@@ -0,0 +1,61 @@
+from typing import Dict, Optional, Tuple
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup, Message
+from loguru import logger
+from cache.lru import LRUCache
+from metrics.registry import edits_skipped
+
+# (chat_id, message_id) -> (хэш текста, хэш клавиатуры) последней отрисовки
+_rendered = LRUCache(maxsize=50_000)
+
+
+def _markup_hash(reply_markup: Optional[InlineKeyboardMarkup]) -> int:
+    if reply_markup is None:
+        return hash(None)
+    return hash(reply_markup.model_dump_json(exclude_none=True))
+
+
+def _current(message: Message) -> Tuple[int, int]:
+    """
+    Отрисовка сообщения, каким его прислал Telegram в callback. Используется,
+    пока сообщения нет в кэше (после рестарта или вытеснения).
+    """
+    text = message.html_text if message.text is not None else None
+    return hash(text), _markup_hash(message.reply_markup)
+
+
+async def edit_message(
+    message: Message,
+    text: Optional[str] = None,
+    reply_markup: Optional[InlineKeyboardMarkup] = None,
+) -> bool:
+    """
+    Редактирует сообщение бота, если отрисовка изменилась: без text меняется
+    только клавиатура (edit_reply_markup), с text — текст и клавиатура
+    (edit_text, отсутствие клавиатуры её убирает). Повторное нажатие той же
+    кнопки не доходит до Bot API. Ответ «message is not modified» тоже
+    считается успешной отрисовкой. Возвращает True, если запрос был отправлен.
+    """
+    key = (message.chat.id, message.message_id)
+    previous = _rendered.get(key) or _current(message)
+    rendered = (previous[0] if text is None else hash(text), _markup_hash(reply_markup))
+    if rendered == previous:
+        edits_skipped.inc()
+        _rendered.set(key, rendered)
+        return False
+
+    try:
+        if text is None:
+            await message.edit_reply_markup(reply_markup=reply_markup)
+        else:
+            await message.edit_text(text, reply_markup=reply_markup)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in e.message:
+            raise
+        logger.debug("Сообщение {} не изменилось", key)
+    _rendered.set(key, rendered)
+    return True
+
+
+def get_cache_stats() -> Dict[str, int]:
+    return {"hits": _rendered.hits, "misses": _rendered.misses, "size": len(_rendered)}
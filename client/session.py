@@ -0,0 +1,144 @@
+import asyncio
+import time
+from typing import Dict, Optional, Union
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from loguru import logger
+from cache.lru import LRUCache
+from metrics.registry import api_retries, api_wait
+
+
+class TokenBucket:
+    """
+    Ведро токенов в форме GCRA: хранится только момент, к которому ведро
+    «опустеет», поэтому резервирование — пара сравнений без таймеров.
+    """
+
+    __slots__ = ("interval", "tolerance", "_tat")
+
+    def __init__(self, rate: float, burst: int):
+        self.interval = 1 / rate
+        # Сколько интервалов можно занять вперёд — размер всплеска
+        self.tolerance = (max(burst, 1) - 1) * self.interval
+        self._tat = 0.0
+
+    def reserve(self, now: float) -> float:
+        # Занимает слот и возвращает, сколько ждать до отправки
+        send_at = max(now, self._tat - self.tolerance)
+        self._tat = max(self._tat, send_at) + self.interval
+        return send_at - now
+
+    def pause(self, until: float) -> None:
+        # После 429 ничего не отправляем до until
+        self._tat = max(self._tat, until + self.tolerance)
+
+
+ChatId = Union[int, str]
+
+
+class RateLimitedSession(AiohttpSession):
+    """
+    Сессия Bot API с ограничением исходящих запросов.
+
+    Запросы с chat_id (отправка и редактирование сообщений) проходят сначала
+    ведро своего чата, затем общее ведро бота — так один активный чат не
+    выбирает лимит за всех. Остальные методы (getUpdates, answerCallbackQuery,
+    setWebhook) идут без ожидания. На TelegramRetryAfter ведро чата (или общее,
+    если чата нет) ставится на паузу на указанное сервером время, и запрос
+    повторяется через ту же очередь, а не сразу.
+    """
+
+    def __init__(
+        self,
+        global_rate: float,
+        global_burst: int,
+        chat_rate: float,
+        chat_burst: int,
+        group_rate: float,
+        max_retries: int,
+        max_retry_after: float,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self._global = TokenBucket(global_rate, global_burst)
+        # Вытесненное ведро давно не использовалось, новое для чата равносильно ему
+        self._chats = LRUCache(maxsize=10_000)
+        # Запросы, ожидающие на каждом этапе
+        self.waiting: Dict[str, int] = {"chat": 0, "global": 0, "retry": 0}
+        self.sent = 0
+        self.retried = 0
+
+    def _chat_bucket(self, chat_id: ChatId) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Отрицательный id и @username — группы и каналы, у них лимит строже
+            private = isinstance(chat_id, int) and chat_id > 0
+            if private:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            else:
+                bucket = TokenBucket(self.group_rate, 1)
+            self._chats.set(chat_id, bucket)
+        return bucket
+
+    async def _wait(self, stage: str, delay: float) -> None:
+        if delay <= 0:
+            return
+        self.waiting[stage] += 1
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.waiting[stage] -= 1
+
+    async def _acquire(self, chat_id: ChatId) -> float:
+        started = time.monotonic()
+        await self._wait("chat", self._chat_bucket(chat_id).reserve(started))
+        # Общий слот берём только после ожидания чата: иначе запрос из
+        # занятого чата держал бы место в общей очереди, пока ждёт свой
+        await self._wait("global", self._global.reserve(time.monotonic()))
+        return time.monotonic() - started
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[TelegramType], timeout: Optional[int] = None
+    ) -> TelegramType:
+        chat_id: Optional[ChatId] = getattr(method, "chat_id", None)
+        attempt = 0
+        while True:
+            if chat_id is not None:
+                api_wait.observe(method.__api_method__, await self._acquire(chat_id))
+            try:
+                result = await super().make_request(bot, method, timeout)
+            except TelegramRetryAfter as e:
+                api_retries.inc(method.__api_method__)
+                if attempt >= self.max_retries or e.retry_after > self.max_retry_after:
+                    raise
+                attempt += 1
+                self.retried += 1
+                logger.warning(
+                    "Флуд-контроль на {} (чат {}): повтор {} через {} с",
+                    method.__api_method__, chat_id, attempt, e.retry_after,
+                )
+                until = time.monotonic() + e.retry_after
+                (self._chat_bucket(chat_id) if chat_id is not None else self._global).pause(until)
+                if chat_id is None:
+                    await self._wait("retry", e.retry_after)
+                continue
+            self.sent += 1
+            return result
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "waiting_chat": self.waiting["chat"],
+            "waiting_global": self.waiting["global"],
+            "waiting_retry": self.waiting["retry"],
+            "chats": len(self._chats),
+            "sent": self.sent,
+            "retried": self.retried,
+        }
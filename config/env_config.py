@@ -1,14 +1,85 @@
+from typing import Dict
 from pydantic.types import SecretStr
 from config.base_conf import ConfigBase
 
 
 class TelegramConfig(ConfigBase):
     bot_token: SecretStr
+    # Режим webhook вместо long polling
+    use_webhook: bool = False
+    webhook_base_url: str = ""
+    webhook_path: str = "/webhook"
+    webhook_secret: SecretStr = SecretStr("")
+    webapp_host: str = "0.0.0.0"
+    webapp_port: int = 8080
+    # Сколько апдейтов разных чатов обрабатывается одновременно
+    update_concurrency: int = 8
+    # Сколько принятых webhook-апдейтов может ждать обработки
+    webhook_queue_size: int = 1000
+    # Исходящие запросы к Bot API: общий лимит бота и лимиты чатов, сообщений в секунду
+    api_global_rate: float = 30.0
+    api_global_burst: int = 30
+    api_chat_rate: float = 1.0
+    api_chat_burst: int = 3
+    # Группы и каналы: не больше 20 сообщений в минуту
+    api_group_rate: float = 20 / 60
+    # Повторы после 429; ответ с большим retry_after не ждём, а отдаём ошибку
+    api_max_retries: int = 3
+    api_max_retry_after: float = 30.0
 
 
 class DatabaseConfig(ConfigBase):
     database_url: str
     sql_echo: bool
+    # Пул соединений: pool_size + max_overflow на процесс должно укладываться в max_connections Postgres
+    db_pool_size: int = 10
+    db_max_overflow: int = 5
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # Параметры asyncpg
+    db_statement_cache_size: int = 100
+    db_command_timeout: float = 10.0
+    # Период логирования состояния пула, секунды (0 — не логировать)
+    db_pool_stats_interval: int = 60
+    # Апдейт с большим числом запросов или с одним и тем же запросом,
+    # повторённым столько раз (признак N+1), попадает в лог предупреждением
+    db_query_budget: int = 15
+    db_query_repeat_limit: int = 5
+
+
+class FSMConfig(ConfigBase):
+    # Ограничение памяти под состояния пользователей
+    fsm_max_keys: int = 100_000
+    fsm_shards: int = 16
+    # Состояние живёт столько секунд с последнего обращения
+    fsm_ttl: int = 86_400
+    # Снимок на диск для восстановления после рестарта (пустой путь — без снимков)
+    fsm_snapshot_path: str = "fsm_snapshot.json"
+    fsm_snapshot_interval: int = 60
+
+
+class StartupConfig(ConfigBase):
+    # Модули обработчиков импортируются при первом апдейте, а не при старте.
+    # Выигрыш — только импорт самих модулей handlers (десятки мс): aiogram.types,
+    # SQLAlchemy и модели всё равно импортируются при старте, а allowed_updates
+    # берутся из объявленного списка, а не из роутеров. Полная картина импорта:
+    # python -X importtime -c "import main"
+    lazy_routers: bool = False
+    # Логировать время импорта каждого модуля обработчиков (без их зависимостей,
+    # уже импортированных к этому моменту)
+    profile_imports: bool = False
+    # Бюджет холодного старта, секунды: от запуска интерпретатора до готовности
+    # принимать апдейты (миграции на актуальной схеме, снимок FSM).
+    # Автоскейлер рассчитывает на это значение, превышение логируется предупреждением.
+    cold_start_budget: float = 5.0
+
+
+class MetricsConfig(ConfigBase):
+    # HTTP-эндпоинт /metrics в формате Prometheus; по умолчанию только локально
+    metrics_enabled: bool = True
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 9100
 
 
 class LogConfig(ConfigBase):
@@ -19,5 +90,10 @@ class LogConfig(ConfigBase):
     log_retention: str
     log_compression: str
     log_to_console: bool
+    # JSON-строки вместо log_format — для сборщиков логов
+    log_json: bool = False
+    # Доля сохраняемых сообщений по уровням, например {"INFO": 0.1}; остальные уровни пишутся целиком.
+    # Сокращает объём записи, но не форматирование: его отключает только LOG_LEVEL
+    log_sampling: Dict[str, float] = {}
 
 
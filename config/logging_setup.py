@@ -0,0 +1,57 @@
+import sys
+from typing import Callable, Dict, Optional
+from loguru import logger
+from config.env_config import LogConfig
+
+
+def _sampling_filter(rates: Dict[str, float]) -> Optional[Callable[[dict], bool]]:
+    """
+    Пропускает каждое N-е сообщение уровня, где N = 1 / доля.
+    Счётчик детерминированный, поэтому все приёмники оставляют одни и те же сообщения.
+
+    Сэмплирование экономит только запись в приёмники: loguru подставляет
+    аргументы в сообщение до фильтров, так что отброшенная запись уже
+    отформатирована. Форматирование пропускается лишь для уровней ниже
+    уровня всех приёмников (LOG_LEVEL).
+    """
+    every = {level.upper(): max(1, round(1 / rate)) for level, rate in rates.items() if rate > 0}
+    dropped = {level.upper() for level, rate in rates.items() if rate <= 0}
+    if not every and not dropped:
+        return None
+    counters = dict.fromkeys(every, 0)
+
+    def _filter(record: dict) -> bool:
+        level = record["level"].name
+        if level in dropped:
+            return False
+        if level not in every:
+            return True
+        counters[level] += 1
+        return counters[level] % every[level] == 1 % every[level]
+
+    return _filter
+
+
+def setup_logging(config: LogConfig) -> None:
+    """
+    Настраивает loguru по LogConfig. Приёмники работают с enqueue=True: запись на диск
+    и в консоль идёт в фоновом потоке и не блокирует цикл событий.
+    """
+    logger.remove()
+    options = {
+        "level": config.log_level.upper(),
+        "format": config.log_format,
+        "serialize": config.log_json,
+        "enqueue": True,
+    }
+    if config.log_to_console:
+        logger.add(sys.stderr, filter=_sampling_filter(config.log_sampling), **options)
+    if config.log_file_path:
+        logger.add(
+            config.log_file_path,
+            rotation=config.log_rotation,
+            retention=config.log_retention,
+            compression=config.log_compression or None,
+            filter=_sampling_filter(config.log_sampling),
+            **options,
+        )
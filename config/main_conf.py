@@ -1,10 +1,13 @@
 from config.base_conf import ConfigBase
-from config.env_config import TelegramConfig, DatabaseConfig, LogConfig
+from config.env_config import TelegramConfig, DatabaseConfig, FSMConfig, LogConfig, MetricsConfig, StartupConfig
 from pydantic import Field
 
 class Settings(ConfigBase):
     tg: TelegramConfig = Field(default_factory=TelegramConfig)
     db: DatabaseConfig = Field(default_factory=DatabaseConfig)
+    fsm: FSMConfig = Field(default_factory=FSMConfig)
     log: LogConfig = Field(default_factory=LogConfig)
+    startup: StartupConfig = Field(default_factory=StartupConfig)
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig)
 
 settings = Settings()
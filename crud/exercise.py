@@ -1,9 +1,46 @@
-from sqlalchemy import select, update, delete, or_
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import select, delete, or_, func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from cache import exercise_catalog
+from cache.exercise_catalog import CatalogExercise
+from crud.workout import touch_workouts_with_exercises
+from database.session import after_commit
 from models.exercise import Exercise
 from models.exercise import ExerciseType
 
 
+class ExercisePage(NamedTuple):
+    # Из кэша каталога приходят снимки CatalogExercise, из БД — модели Exercise
+    exercises: List[Exercise | CatalogExercise]
+    total: int
+    prev_cursor: Optional[str]
+    next_cursor: Optional[str]
+
+
+# Курсор страницы: направление (a — после, b — до) + id опорного упражнения в base36.
+# Имя в курсор не кладём: callback_data ограничена 64 байтами.
+CURSOR_AFTER = "a"
+CURSOR_BEFORE = "b"
+
+
+def encode_cursor(direction: str, exercise_id: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    encoded = ""
+    while True:
+        exercise_id, rest = divmod(exercise_id, 36)
+        encoded = digits[rest] + encoded
+        if exercise_id == 0:
+            break
+    return direction + encoded
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    direction, encoded = cursor[:1], cursor[1:]
+    if direction not in (CURSOR_AFTER, CURSOR_BEFORE) or not encoded:
+        raise ValueError(f"Некорректный курсор: {cursor}")
+    return direction, int(encoded, 36)
+
 
 async def get_user_exercises(session: AsyncSession, user_id: int):
     stmt = select(Exercise).where(
@@ -14,52 +51,149 @@ async def get_user_exercises(session: AsyncSession, user_id: int):
     return result.scalars().all()
 
 
-async def get_user_exercises_paginated(session: AsyncSession, user_id: int, offset: int = 0, limit: int = 5):
-    stmt = (
-        select(Exercise)
-        .where((Exercise.user_id == user_id) | (Exercise.is_default == True))
-        .order_by(Exercise.name)
-        .offset(offset)
-        .limit(limit)
-    )
-    result = await session.execute(stmt)
-    exercises = result.scalars().all()
+async def _get_exercises_page(session: AsyncSession, conditions: list, page_size: int, cursor: Optional[str]) -> ExercisePage:
+    """
+    Keyset-пагинация по (name, id). Общее количество считается подзапросом
+    в том же запросе, лишняя строка в LIMIT показывает, есть ли следующая страница.
+    """
+    total_stmt = select(func.count()).select_from(Exercise).where(*conditions).correlate(None).scalar_subquery()
+    stmt = select(Exercise, total_stmt).where(*conditions)
 
-    count_stmt = (
-        select(Exercise.id)
-        .where((Exercise.user_id == user_id) | (Exercise.is_default == True))
-    )
-    total_result = await session.execute(count_stmt)
-    total = len(total_result.scalars().all())
+    direction = None
+    if cursor:
+        direction, anchor_id = decode_cursor(cursor)
+        anchor = aliased(Exercise)
+        anchor_name = select(anchor.name).where(anchor.id == anchor_id).scalar_subquery()
+        if direction == CURSOR_AFTER:
+            stmt = stmt.where(tuple_(Exercise.name, Exercise.id) > tuple_(anchor_name, anchor_id))
+        else:
+            stmt = stmt.where(tuple_(Exercise.name, Exercise.id) < tuple_(anchor_name, anchor_id))
 
-    return exercises, total
+    if direction == CURSOR_BEFORE:
+        stmt = stmt.order_by(Exercise.name.desc(), Exercise.id.desc())
+    else:
+        stmt = stmt.order_by(Exercise.name, Exercise.id)
 
+    result = await session.execute(stmt.limit(page_size + 1))
+    rows = result.all()
+
+    if not rows:
+        if cursor:
+            # Опорное упражнение удалено или страница опустела — начинаем сначала
+            return await _get_exercises_page(session, conditions, page_size, None)
+        return ExercisePage([], 0, None, None)
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    total = rows[0][1]
+    exercises = [row[0] for row in rows]
+
+    if direction == CURSOR_BEFORE:
+        exercises.reverse()
+        prev_cursor = encode_cursor(CURSOR_BEFORE, exercises[0].id) if has_more else None
+        next_cursor = encode_cursor(CURSOR_AFTER, exercises[-1].id)
+    else:
+        prev_cursor = encode_cursor(CURSOR_BEFORE, exercises[0].id) if direction else None
+        next_cursor = encode_cursor(CURSOR_AFTER, exercises[-1].id) if has_more else None
+
+    return ExercisePage(exercises, total, prev_cursor, next_cursor)
+
+
+# Ключ «изменённых» упражнений по умолчанию в session.info["catalog_dirty"]
+_DEFAULTS = "defaults"
+
+
+def _invalidate_catalog(session: AsyncSession, user_id: Optional[int]) -> None:
+    """
+    До коммита каталог этой сессии читается из БД мимо кэша, чтобы не
+    закэшировать незакоммиченные изменения; после коммита кэш сбрасывается.
+    user_id=None — изменились упражнения по умолчанию.
+    """
+    session.info.setdefault("catalog_dirty", set()).add(_DEFAULTS if user_id is None else user_id)
+    if user_id is None:
+        after_commit(session, exercise_catalog.forget_defaults)
+    else:
+        after_commit(session, lambda: exercise_catalog.forget_user(user_id))
 
-async def get_exercises_by_type(session, exercise_type: str, user_id: int, page: int, page_size: int):
-    offset = page * page_size
-    enum_type = ExerciseType[exercise_type.upper()]
-    stmt = (
-        select(Exercise)
-        .where(
-            Exercise.type == enum_type,
-            or_(Exercise.user_id == user_id, Exercise.is_default == True)
-        )
-        .offset(offset)
-        .limit(page_size)
-    )
 
-    count_stmt = (
-        select(Exercise)
-        .where(
-            Exercise.type == enum_type,
-            or_(Exercise.user_id == user_id, Exercise.is_default == True)
+async def _load_defaults(session: AsyncSession) -> Dict[int, CatalogExercise]:
+    result = await session.execute(select(Exercise).where(Exercise.is_default == True))
+    return exercise_catalog.set_defaults(CatalogExercise.from_model(ex) for ex in result.scalars())
+
+
+async def _load_catalog(session: AsyncSession, user_id: int) -> bool:
+    """
+    Подгружает в кэш недостающие части каталога пользователя.
+    Возвращает True, если страницы можно отдавать из памяти.
+    """
+    dirty = session.info.get("catalog_dirty", ())
+    if _DEFAULTS in dirty or user_id in dirty:
+        return False
+
+    if not exercise_catalog.has_defaults():
+        await _load_defaults(session)
+
+    if not exercise_catalog.has_user(user_id):
+        result = await session.execute(
+            select(Exercise)
+            .where(Exercise.user_id == user_id, Exercise.is_default == False)
+            .limit(exercise_catalog.MAX_USER_EXERCISES + 1)
         )
-    )
+        own = result.scalars().all()
+        # Пока шёл запрос, упражнения по умолчанию могли сбросить — читаем их один раз после него
+        defaults = exercise_catalog.get_defaults()
+        if defaults is None:
+            defaults = await _load_defaults(session)
+        if len(own) > exercise_catalog.MAX_USER_EXERCISES:
+            exercise_catalog.set_user(user_id, None, defaults)
+        else:
+            exercise_catalog.set_user(user_id, [CatalogExercise.from_model(ex) for ex in own], defaults)
 
-    result = await session.execute(stmt)
-    total_result = await session.execute(count_stmt)
-    total = len(total_result.scalars().all())
-    return result.scalars().all(), total
+    return exercise_catalog.is_user_cached(user_id)
+
+
+def _get_cached_page(exercises: exercise_catalog.SortedExercises, page_size: int, cursor: Optional[str]) -> ExercisePage:
+    # Та же keyset-пагинация, что и в _get_exercises_page, но по списку в памяти
+    if not exercises:
+        return ExercisePage([], 0, None, None)
+
+    direction = None
+    if cursor:
+        direction, anchor_id = decode_cursor(cursor)
+        if direction == CURSOR_AFTER:
+            page, has_more = exercise_catalog.page_after(exercises, anchor_id, page_size)
+        else:
+            page, has_more = exercise_catalog.page_before(exercises, anchor_id, page_size)
+        if not page:
+            return _get_cached_page(exercises, page_size, None)
+    else:
+        page, has_more = exercise_catalog.page_after(exercises, None, page_size)
+
+    if direction == CURSOR_BEFORE:
+        prev_cursor = encode_cursor(CURSOR_BEFORE, page[0].id) if has_more else None
+        next_cursor = encode_cursor(CURSOR_AFTER, page[-1].id)
+    else:
+        prev_cursor = encode_cursor(CURSOR_BEFORE, page[0].id) if direction else None
+        next_cursor = encode_cursor(CURSOR_AFTER, page[-1].id) if has_more else None
+
+    return ExercisePage(page, len(exercises), prev_cursor, next_cursor)
+
+
+async def get_user_exercises_paginated(session: AsyncSession, user_id: int, cursor: Optional[str] = None, limit: int = 5) -> ExercisePage:
+    conditions = [(Exercise.user_id == user_id) | (Exercise.is_default == True)]
+    return await _get_exercises_page(session, conditions, limit, cursor)
+
+
+async def get_exercises_by_type(session, exercise_type: str, user_id: int, page_size: int, cursor: Optional[str] = None) -> ExercisePage:
+    enum_type = ExerciseType[exercise_type.upper()]
+    if await _load_catalog(session, user_id):
+        return _get_cached_page(exercise_catalog.get_exercises(user_id, enum_type), page_size, cursor)
+
+    conditions = [
+        Exercise.type == enum_type,
+        or_(Exercise.user_id == user_id, Exercise.is_default == True)
+    ]
+    return await _get_exercises_page(session, conditions, page_size, cursor)
 
 
 async def create_exercise(
@@ -82,33 +216,51 @@ async def create_exercise(
         is_default=is_default
     )
     session.add(exercise)
-    await session.commit()
-    await session.refresh(exercise)
+    await session.flush()
+    _invalidate_catalog(session, None if is_default else user_id)
     return exercise
 
-async def get_exercise_by_id(session: AsyncSession, ex_id: int) -> Exercise | None:
+async def get_exercise_by_id(
+    session: AsyncSession, ex_id: int, user_id: Optional[int] = None
+) -> Exercise | CatalogExercise | None:
+    # С user_id упражнение сначала ищется в кэше каталога этого пользователя
+    if user_id is not None and await _load_catalog(session, user_id):
+        exercise = exercise_catalog.get_exercise(user_id, ex_id)
+        if exercise is not None:
+            return exercise
+
     stmt = select(Exercise).where(Exercise.id == ex_id)
+    if user_id is not None:
+        # Те же права, что и у кэша: упражнения по умолчанию и свои
+        stmt = stmt.where(or_(Exercise.user_id == user_id, Exercise.is_default == True))
     result = await session.execute(stmt)
     return result.scalar_one_or_none()
 
-async def update_exercise_by_name(session: AsyncSession, exercise_id: int, new_name: str) -> Exercise:
-    exercise = await session.get(Exercise, exercise_id)
+async def update_exercise_by_name(session: AsyncSession, exercise_id: int, new_name: str, user_id: int) -> Exercise:
+    # Переименовать можно только своё упражнение: упражнения по умолчанию общие для всех
+    stmt = select(Exercise).where(
+        Exercise.id == exercise_id, Exercise.user_id == user_id, Exercise.is_default == False
+    )
+    exercise = (await session.execute(stmt)).scalar_one_or_none()
     if exercise is None:
         raise ValueError(f"Упражнение с ID {exercise_id} не найдено.")
 
     exercise.name = new_name
-    await session.commit()
-    await session.refresh(exercise)
+    await session.flush()
+    _invalidate_catalog(session, user_id)
+    await touch_workouts_with_exercises(session, [exercise_id])
     return exercise
 
 async def delete_exercise(session: AsyncSession, ex_id: int, user_id: int):
-    stmt = delete(Exercise).where(
+    conditions = (
         Exercise.id == ex_id,
         Exercise.user_id == user_id,
         Exercise.is_default.is_(False)
     )
+    # Строки тренировок удалятся каскадом, поэтому версии поднимаем заранее
+    await touch_workouts_with_exercises(session, select(Exercise.id).where(*conditions))
+    stmt = delete(Exercise).where(*conditions)
     result = await session.execute(stmt)
-    await session.commit()
+    if result.rowcount:
+        _invalidate_catalog(session, user_id)
     return result.rowcount
-
-    await session.commit()
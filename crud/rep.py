@@ -1,26 +1,24 @@
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from models.rep import Rep
 from typing import List, Dict
 
 async def create_reps(session: AsyncSession, workout_exercise_id: int, reps: List[Dict]) -> None:
-    rep_objects = []
-    for rep in reps:
-        if "duration" in rep:
-            # Для кардио упражнений
-            rep_objects.append(Rep(
-                workout_exercise_id=workout_exercise_id,
-                duration=rep["duration"],
-                weight=0,
-                count=0
-            ))
-        else:
-            # Для силовых упражнений
-            rep_objects.append(Rep(
-                workout_exercise_id=workout_exercise_id,
-                weight=rep["weight"],
-                count=rep["count"],
-                duration=0
-            ))
+    """
+    Вставляет все подходы одним многострочным INSERT на уровне Core, без ORM-объектов.
+    Поля, не относящиеся к типу упражнения, записываются как NULL:
+    у кардио нет веса и повторов, у силовых — длительности.
+    """
+    if not reps:
+        return
 
-    session.add_all(rep_objects)
-    await session.commit()
+    rows = [
+        {
+            "workout_exercise_id": workout_exercise_id,
+            "weight": rep.get("weight"),
+            "count": rep.get("count"),
+            "duration": rep.get("duration"),
+        }
+        for rep in reps
+    ]
+    await session.execute(insert(Rep.__table__).values(rows))
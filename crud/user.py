@@ -1,21 +1,37 @@
-from sqlalchemy import select
+from typing import Optional
+from sqlalchemy import func, literal_column, or_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from cache import known_users
+from database.session import after_commit
 from models.user import User
 
 
-async def add_user(session: AsyncSession, id: int, username: str, full_name: str) -> bool:
-    existing_user = await session.scalar(select(User).where(User.id == id))
-
-    if existing_user is None:
-        user = User(
-            id=id,
-            username=username,
-            full_name=full_name
-        )
-        session.add(user)
-        await session.commit()
-        return True
-    else:
+async def add_user(session: AsyncSession, id: int, username: Optional[str], full_name: Optional[str]) -> bool:
+    """
+    Регистрирует пользователя или обновляет его username и full_name.
+    Возвращает True, если пользователь создан. Известные пользователи
+    с неизменёнными данными проверяются по кэшу, без запроса к БД.
+    """
+    if known_users.is_known(id, username, full_name):
         return False
 
+    stmt = insert(User).values(id=id, username=username, full_name=full_name)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.id],
+        set_={
+            "username": stmt.excluded.username,
+            "full_name": stmt.excluded.full_name,
+            "updated_at": func.now(),
+        },
+        # Без изменений строку не переписываем
+        where=or_(
+            User.username.is_distinct_from(stmt.excluded.username),
+            User.full_name.is_distinct_from(stmt.excluded.full_name),
+        ),
+    ).returning(literal_column("xmax = 0").label("created"))
+    created = (await session.execute(stmt)).scalar_one_or_none()
 
+    after_commit(session, lambda: known_users.remember(id, username, full_name))
+    # Пустой RETURNING — пользователь уже был и его данные не изменились
+    return bool(created)
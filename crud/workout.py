@@ -1,12 +1,25 @@
-from sqlalchemy import select, update, delete
-from sqlalchemy.orm import selectinload, joinedload
-from database.session import AsyncSessionLocal
+import datetime
+from sqlalchemy import select, update, delete, func, literal_column
+from sqlalchemy.dialects.postgresql import insert
+from cache import workout_dates
+from crud.rep import create_reps
+from database.session import AsyncSessionLocal, after_commit
+from models.exercise import Exercise
+from models.rep import Rep
 from models.workout import Workout
 from schemas.workout import WorkoutCreateSchema, WorkoutUpdateSchema
-from typing import List, Optional
+from typing import Dict, List, NamedTuple, Optional
 from models.workout_exercise import WorkoutExercise
 
 
+class LoggedSets(NamedTuple):
+    workout_id: int
+    workout_exercise_id: int
+    # Версия тренировки после записи и признак того, что тренировка только что создана
+    version: int
+    created: bool
+
+
 # Получить тренировку по id
 async def get_workout_by_id(session: AsyncSessionLocal, workout_id: int) -> Optional[Workout]:
     result = await session.execute(select(Workout).where(Workout.id == workout_id))
@@ -16,102 +29,217 @@ async def get_workout_by_id(session: AsyncSessionLocal, workout_id: int) -> Opti
 async def get_user_workouts(session: AsyncSessionLocal, user_id: int) -> List[Workout]:
     result = await session.execute(
         select(Workout)
-        .options(
-            selectinload(Workout.exercises).selectinload(WorkoutExercise.exercise)
-        )
         .where(Workout.user_id == user_id)
+        .order_by(Workout.date)
     )
     return result.scalars().all()
 
 
+# Даты тренировок пользователя в полуоткрытом интервале [start, end)
+async def get_workout_dates_in_range(
+    session: AsyncSessionLocal,
+    user_id: int,
+    start: datetime.date,
+    end: datetime.date,
+) -> List[datetime.date]:
+    stmt = (
+        select(Workout.date)
+        .where(Workout.user_id == user_id, Workout.date >= start, Workout.date < end)
+        .distinct()
+    )
+    result = await session.execute(stmt)
+    return list(result.scalars().all())
 
-# Создать тренировку
-async def create_workout(session: AsyncSessionLocal, user_id: int, data: WorkoutCreateSchema) -> Workout:
-    workout = Workout(user_id=user_id, date=data.date, comment=data.comment)
-    session.add(workout)
-    await session.commit()
-    await session.refresh(workout)
+
+# Даты тренировок за месяц: сначала кэш, при промахе — один запрос по диапазону
+async def get_workout_dates_by_month(session: AsyncSessionLocal, user_id: int, year: int, month: int) -> List[datetime.date]:
+    mask = workout_dates.get_month_mask(user_id, year, month)
+    if mask is None:
+        start = datetime.date(year, month, 1)
+        end = datetime.date(year + 1, 1, 1) if month == 12 else datetime.date(year, month + 1, 1)
+        dates = await get_workout_dates_in_range(session, user_id, start, end)
+        mask = workout_dates.dates_to_mask(dates)
+        workout_dates.set_month_mask(user_id, year, month, mask)
+    return workout_dates.mask_to_dates(year, month, mask)
+
+
+# Создать тренировку; None — на эту дату у пользователя уже есть тренировка
+async def create_workout(session: AsyncSessionLocal, user_id: int, data: WorkoutCreateSchema) -> Optional[Workout]:
+    stmt = (
+        insert(Workout)
+        .values(user_id=user_id, date=data.date, comment=data.comment)
+        # Тот же уникальный индекс (user_id, date), что и в log_sets
+        .on_conflict_do_nothing(index_elements=[Workout.user_id, Workout.date])
+        .returning(Workout)
+    )
+    workout = (await session.execute(stmt)).scalar_one_or_none()
+    if workout is not None:
+        after_commit(session, lambda: workout_dates.mark_date(user_id, data.date))
     return workout
 
 # Обновить тренировку
 async def update_workout(session: AsyncSessionLocal, workout_id: int, data: WorkoutUpdateSchema) -> Optional[Workout]:
-    stmt = update(Workout).where(Workout.id == workout_id).values(**data.dict(exclude_unset=True)).execution_options(synchronize_session="fetch")
-    await session.execute(stmt)
-    await session.commit()
-    return await get_workout_by_id(session, workout_id)
-
-# Удалить тренировку
-async def delete_workout(session: AsyncSessionLocal, workout_id: int) -> None:
-    await session.execute(delete(Workout).where(Workout.id == workout_id))
-    await session.commit()
-
-# Получить тренировку пользователя по дате
-async def get_workout_by_user_and_date(session: AsyncSessionLocal, user_id: int, date) -> Optional[Workout]:
     stmt = (
-        select(Workout)
-        .where(Workout.user_id == user_id, Workout.date == date)
-        .options(
-            joinedload(Workout.exercises)
-            .joinedload(WorkoutExercise.exercise)
-        )
+        update(Workout)
+        .where(Workout.id == workout_id)
+        .values(**data.dict(exclude_unset=True), version=Workout.version + 1)
+        .returning(Workout.user_id)
+        .execution_options(synchronize_session="fetch")
     )
     result = await session.execute(stmt)
-    workout = result.unique().scalar_one_or_none()
-
-    if not workout:
-        return None
-
-    return workout
+    user_id = result.scalar_one_or_none()
+    if user_id is not None:
+        # Дата могла измениться — сбрасываем закэшированные месяцы пользователя
+        after_commit(session, lambda: workout_dates.forget_user(user_id))
+    return await get_workout_by_id(session, workout_id)
 
+# Увеличить версию тренировок, в которые входят упражнения: их название
+# или само упражнение меняется в обход log_sets
+async def touch_workouts_with_exercises(session: AsyncSessionLocal, exercise_ids) -> None:
+    await session.execute(
+        update(Workout)
+        .where(Workout.id.in_(
+            select(WorkoutExercise.workout_id).where(WorkoutExercise.exercise_id.in_(exercise_ids))
+        ))
+        .values(version=Workout.version + 1)
+        .execution_options(synchronize_session=False)
+    )
 
-async def get_workout_details(session: AsyncSessionLocal, workout: Workout) -> dict:
+# Удалить тренировку
+async def delete_workout(session: AsyncSessionLocal, workout_id: int) -> None:
+    result = await session.execute(
+        delete(Workout).where(Workout.id == workout_id).returning(Workout.user_id, Workout.date)
+    )
+    deleted = result.one_or_none()
+    if deleted is not None:
+        after_commit(session, lambda: workout_dates.forget_month(deleted.user_id, deleted.date.year, deleted.date.month))
+
+
+# Записать подходы упражнения в тренировку на дату
+async def log_sets(
+    session: AsyncSessionLocal,
+    user_id: int,
+    date: datetime.date,
+    exercise_id: int,
+    reps: List[Dict],
+) -> LoggedSets:
     """
-    Преобразует объект тренировки в словарь с детальной информацией о упражнениях
+    Тренировка и упражнение в ней находятся или создаются через
+    INSERT ... ON CONFLICT ... RETURNING, подходы вставляются пачкой.
+    Всё выполняется в одной транзакции сессии, без промежуточных коммитов.
+    Версия существующей тренировки увеличивается на единицу, новая создаётся
+    с версией 0 — по ним вызывающий код решает, можно ли обновить
+    закэшированное представление тренировки без повторного чтения.
     """
-    # Получаем тренировку со всеми связанными данными в одном запросе
-    stmt = (
-        select(Workout)
-        .where(Workout.id == workout.id)
-        .options(
-            joinedload(Workout.exercises).joinedload(WorkoutExercise.exercise),
-            joinedload(Workout.exercises).joinedload(WorkoutExercise.reps)
+    workout_stmt = (
+        insert(Workout)
+        .values(user_id=user_id, date=date)
+        .on_conflict_do_update(
+            index_elements=[Workout.user_id, Workout.date],
+            set_={"updated_at": func.now(), "version": Workout.version + 1}
         )
+        # xmax = 0 только у строки, вставленной этим запросом
+        .returning(Workout.id, Workout.version, literal_column("xmax = 0").label("created"))
     )
-    result = await session.execute(stmt)
-    workout = result.unique().scalar_one()
-
-    workout_data = {
-        "id": workout.id,
-        "date": workout.date,
-        "user_id": workout.user_id,
-        "note": workout.comment,
-        "exercises": []
-    }
-
-    # Сортируем упражнения по id (порядок добавления)
-    sorted_exercises = sorted(workout.exercises, key=lambda x: x.id)
-
-    # Теперь все связанные данные уже загружены
-    for we in sorted_exercises:
-        exercise = we.exercise
-        exercise_data = {
-            "id": exercise.id,
-            "name": exercise.name,
-            "type": exercise.type.value,
-            "reps": []
-        }
-
-        # Сортируем подходы по id (порядок добавления)
-        sorted_reps = sorted(we.reps, key=lambda x: x.id)
-
-        # Используем предзагруженные подходы
-        for rep in sorted_reps:
+    workout_id, version, created = (await session.execute(workout_stmt)).one()
+
+    workout_exercise_stmt = (
+        insert(WorkoutExercise)
+        .values(workout_id=workout_id, exercise_id=exercise_id)
+        .on_conflict_do_update(
+            index_elements=[WorkoutExercise.workout_id, WorkoutExercise.exercise_id],
+            set_={"updated_at": func.now()}
+        )
+        .returning(WorkoutExercise.id)
+    )
+    workout_exercise_id = (await session.execute(workout_exercise_stmt)).scalar_one()
+
+    if reps:
+        await create_reps(session, workout_exercise_id, reps)
+
+    after_commit(session, lambda: workout_dates.mark_date(user_id, date))
+    return LoggedSets(workout_id, workout_exercise_id, version, created)
+
+
+def _workout_details_query():
+    # Одна строка на подход: только нужные столбцы, уже в порядке добавления
+    return (
+        select(
+            Workout.id.label("workout_id"),
+            Workout.date,
+            Workout.user_id,
+            Workout.comment,
+            Workout.version,
+            WorkoutExercise.id.label("workout_exercise_id"),
+            Exercise.id.label("exercise_id"),
+            Exercise.name,
+            Exercise.type,
+            Rep.id.label("rep_id"),
+            Rep.weight,
+            # у Row есть метод count, поэтому столбец переименован
+            Rep.count.label("rep_count"),
+            Rep.duration,
+        )
+        .select_from(Workout)
+        .outerjoin(WorkoutExercise, WorkoutExercise.workout_id == Workout.id)
+        .outerjoin(Exercise, Exercise.id == WorkoutExercise.exercise_id)
+        .outerjoin(Rep, Rep.workout_exercise_id == WorkoutExercise.id)
+        .order_by(WorkoutExercise.id, Rep.id)
+    )
+
+
+def _collect_workout_details(rows) -> Optional[dict]:
+    workout_data = None
+    exercise_data = None
+    for row in rows:
+        if workout_data is None:
+            workout_data = {
+                "id": row.workout_id,
+                "date": row.date,
+                "user_id": row.user_id,
+                "note": row.comment,
+                "version": row.version,
+                "exercises": []
+            }
+        if row.workout_exercise_id is None:
+            continue
+
+        # Строки идут подряд по упражнению — новое упражнение начинается со смены id
+        if exercise_data is None or exercise_data["workout_exercise_id"] != row.workout_exercise_id:
+            exercise_data = {
+                "workout_exercise_id": row.workout_exercise_id,
+                "id": row.exercise_id,
+                "name": row.name,
+                "type": row.type.value,
+                "reps": []
+            }
+            workout_data["exercises"].append(exercise_data)
+
+        if row.rep_id is not None:
             exercise_data["reps"].append({
-                "weight": rep.weight,
-                "count": rep.count,
-                "duration": rep.duration
+                "weight": row.weight,
+                "count": row.rep_count,
+                "duration": row.duration
             })
+    return workout_data
 
-        workout_data["exercises"].append(exercise_data)
 
+async def get_workout_details(session: AsyncSessionLocal, workout_id: int) -> dict:
+    """
+    Преобразует тренировку в словарь с детальной информацией о упражнениях.
+    Читает одним плоским запросом только нужные столбцы: по строке на подход,
+    уже упорядоченные по порядку добавления, без ORM-объектов и дедупликации.
+    """
+    result = await session.execute(_workout_details_query().where(Workout.id == workout_id))
+    workout_data = _collect_workout_details(result)
+    if workout_data is None:
+        raise ValueError(f"Тренировка с ID {workout_id} не найдена.")
     return workout_data
+
+
+async def get_workout_details_by_date(session: AsyncSessionLocal, user_id: int, date) -> Optional[dict]:
+    # То же представление по дате, одним запросом; None — тренировки на эту дату нет
+    result = await session.execute(
+        _workout_details_query().where(Workout.user_id == user_id, Workout.date == date)
+    )
+    return _collect_workout_details(result)
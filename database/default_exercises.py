@@ -1,31 +1,28 @@
-from sqlalchemy import select
-from database.connection import connection
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
 from models.exercise import Exercise, ExerciseType
 
-# Упражнения по умолчанию
+# Упражнения по умолчанию. slug не меняется никогда: по нему сидирование
+# узнаёт уже добавленные упражнения, даже если их переименовали.
 DEFAULT_EXERCISES = [
-    {"name": "Приседания со штангой", "type": ExerciseType.STRENGTH},
-    {"name": "Жим лёжа", "type": ExerciseType.STRENGTH},
-    {"name": "Становая тяга", "type": ExerciseType.STRENGTH},
-    {"name": "Беговая дорожка", "type": ExerciseType.CARDIO},
-    {"name": "Велотренажёр", "type": ExerciseType.CARDIO},
-    {"name": "Скакалка", "type": ExerciseType.CARDIO},
+    {"slug": "barbell_squat", "name": "Приседания со штангой", "type": ExerciseType.STRENGTH},
+    {"slug": "bench_press", "name": "Жим лёжа", "type": ExerciseType.STRENGTH},
+    {"slug": "deadlift", "name": "Становая тяга", "type": ExerciseType.STRENGTH},
+    {"slug": "treadmill", "name": "Беговая дорожка", "type": ExerciseType.CARDIO},
+    {"slug": "exercise_bike", "name": "Велотренажёр", "type": ExerciseType.CARDIO},
+    {"slug": "jump_rope", "name": "Скакалка", "type": ExerciseType.CARDIO},
 ]
 
 
-@connection
-async def init_default_exercises(session):
-    existing = await session.scalar(select(Exercise).where(Exercise.is_default == True))
-    if existing:
-        return
-
-    for data in DEFAULT_EXERCISES:
-        exercise = Exercise(
-            name=data["name"],
-            type=data["type"],
-            is_default=True,
-            user_id=None,
-        )
-        session.add(exercise)
-
-    await session.commit()
+async def init_default_exercises(conn: AsyncConnection) -> int:
+    """
+    Добавляет недостающие упражнения по умолчанию одним INSERT ... ON CONFLICT DO NOTHING.
+    Возвращает число добавленных.
+    """
+    stmt = (
+        insert(Exercise)
+        .values([{**data, "is_default": True, "user_id": None} for data in DEFAULT_EXERCISES])
+        .on_conflict_do_nothing(index_elements=[Exercise.slug])
+    )
+    result = await conn.execute(stmt)
+    return result.rowcount
@@ -1,15 +1,17 @@
-from database.session import engine, AsyncSessionLocal
+import time
 from loguru import logger
-from models.base import Base
 from database.default_exercises import init_default_exercises
+from database.migrations import run_migrations
+from database.session import engine
 
-# Инициализация базы данных и создание таблиц
+
+# Инициализация базы данных: применение миграций и упражнения по умолчанию
 async def create_tables_and_exercises():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        logger.info("✅ Таблицы успешно созданы.")
+    started = time.perf_counter()
+    await run_migrations()
+    migrated = time.perf_counter()
+    logger.info("✅ Схема базы данных актуальна ({:.3f} с).", migrated - started)
 
-# Добавляем упражнения по умолчанию
-    async with AsyncSessionLocal() as session:
-        await init_default_exercises()
-        logger.info("✅ Упражнения по умолчанию добавлены.")
\ No newline at end of file
+    async with engine.begin() as conn:
+        added = await init_default_exercises(conn)
+    logger.info("✅ Упражнения по умолчанию: добавлено {} ({:.3f} с).", added, time.perf_counter() - migrated)
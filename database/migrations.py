@@ -0,0 +1,201 @@
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List
+from loguru import logger
+from sqlalchemy import Index, text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncConnection
+from database.default_exercises import DEFAULT_EXERCISES
+from database.session import engine
+from models.base import Base
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[AsyncConnection], Awaitable[None]]
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    transactional: bool = True
+
+
+# Ключ advisory-блокировки: несколько процессов бота не мигрируют базу одновременно
+MIGRATIONS_LOCK_KEY = 7_420_001
+
+
+def _find_index(name: str) -> Index:
+    for table in Base.metadata.tables.values():
+        for index in table.indexes:
+            if index.name == name:
+                return index
+    raise LookupError(f"Индекс {name} не объявлен в моделях")
+
+
+async def _create_index_concurrently(conn: AsyncConnection, name: str) -> None:
+    """
+    Создаёт объявленный в моделях индекс без блокировки записи в таблицу.
+    Невалидный индекс, оставшийся от прерванной попытки, пересоздаётся.
+    """
+    is_valid = await conn.scalar(
+        text(
+            "SELECT i.indisvalid FROM pg_class c "
+            "JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name"
+        ),
+        {"name": name},
+    )
+    if is_valid:
+        return
+    if is_valid is False:
+        logger.warning("Индекс {} невалиден, пересоздаём.", name)
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+    index = _find_index(name)
+    columns = ", ".join(column.name for column in index.columns)
+    unique = "UNIQUE " if index.unique else ""
+    await conn.execute(text(
+        f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {index.table.name} ({columns})"
+    ))
+
+
+# --- Миграции. Каждая должна быть идемпотентной: на новой базе версия 1
+# --- создаёт схему по текущим моделям, и последующие шаги ничего не меняют.
+
+async def _create_tables(conn: AsyncConnection) -> None:
+    await conn.run_sync(Base.metadata.create_all)
+
+
+async def _merge_duplicate_workouts(conn: AsyncConnection) -> None:
+    # Перед уникальными индексами сливаем дубликаты в самую раннюю запись
+    await conn.execute(text(
+        "UPDATE workout_exercises we SET workout_id = d.keep_id "
+        "FROM (SELECT id, min(id) OVER (PARTITION BY user_id, date) AS keep_id FROM workouts) d "
+        "WHERE we.workout_id = d.id AND d.id <> d.keep_id"
+    ))
+    await conn.execute(text(
+        "DELETE FROM workouts w "
+        "USING (SELECT id, min(id) OVER (PARTITION BY user_id, date) AS keep_id FROM workouts) d "
+        "WHERE w.id = d.id AND d.id <> d.keep_id"
+    ))
+    await conn.execute(text(
+        "UPDATE reps r SET workout_exercise_id = d.keep_id "
+        "FROM (SELECT id, min(id) OVER (PARTITION BY workout_id, exercise_id) AS keep_id FROM workout_exercises) d "
+        "WHERE r.workout_exercise_id = d.id AND d.id <> d.keep_id"
+    ))
+    await conn.execute(text(
+        "DELETE FROM workout_exercises we "
+        "USING (SELECT id, min(id) OVER (PARTITION BY workout_id, exercise_id) AS keep_id FROM workout_exercises) d "
+        "WHERE we.id = d.id AND d.id <> d.keep_id"
+    ))
+
+
+async def _create_hot_path_indexes(conn: AsyncConnection) -> None:
+    for name in (
+        "ix_exercises_user_id_type_name",
+        "ix_exercises_is_default",
+        "uq_workouts_user_id_date",
+        "uq_workout_exercises_workout_id_exercise_id",
+        "ix_reps_workout_exercise_id",
+    ):
+        await _create_index_concurrently(conn, name)
+
+
+async def _null_unused_rep_fields(conn: AsyncConnection) -> None:
+    # Раньше неприменимые поля подхода заполнялись нулями вместо NULL
+    await conn.execute(text(
+        "UPDATE reps SET weight = NULL, count = NULL "
+        "WHERE duration > 0 AND weight = 0 AND count = 0"
+    ))
+    await conn.execute(text(
+        "UPDATE reps SET duration = NULL "
+        "WHERE duration = 0 AND count > 0"
+    ))
+
+
+async def _add_workout_version(conn: AsyncConnection) -> None:
+    await conn.execute(text(
+        "ALTER TABLE workouts ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0"
+    ))
+
+
+async def _add_exercise_slug(conn: AsyncConnection) -> None:
+    await conn.execute(text("ALTER TABLE exercises ADD COLUMN IF NOT EXISTS slug VARCHAR"))
+    # Уже засеянным упражнениям по умолчанию проставляем slug по названию;
+    # из дублей, если они есть, ключ получает самое раннее
+    for data in DEFAULT_EXERCISES:
+        await conn.execute(
+            text(
+                "UPDATE exercises SET slug = :slug WHERE id = ("
+                "SELECT min(id) FROM exercises WHERE is_default AND name = :name) "
+                "AND NOT EXISTS (SELECT 1 FROM exercises WHERE slug = :slug)"
+            ),
+            {"slug": data["slug"], "name": data["name"]},
+        )
+
+
+async def _create_slug_index(conn: AsyncConnection) -> None:
+    await _create_index_concurrently(conn, "uq_exercises_slug")
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Создание таблиц", _create_tables),
+    Migration(2, "Слияние дублей тренировок и упражнений в тренировке", _merge_duplicate_workouts),
+    Migration(3, "Индексы для горячих запросов", _create_hot_path_indexes, transactional=False),
+    Migration(4, "NULL вместо нулей в неприменимых полях подходов", _null_unused_rep_fields),
+    Migration(5, "Версия тренировки", _add_workout_version),
+    Migration(6, "slug упражнений по умолчанию", _add_exercise_slug),
+    Migration(7, "Уникальный индекс по slug упражнений", _create_slug_index, transactional=False),
+]
+
+
+async def _record_version(conn: AsyncConnection, migration: Migration) -> None:
+    await conn.execute(
+        text("INSERT INTO schema_version (version, description) VALUES (:version, :description)"),
+        {"version": migration.version, "description": migration.description},
+    )
+
+
+async def _is_schema_current() -> bool:
+    # Один запрос без блокировок и DDL: на актуальной схеме на этом всё и заканчивается
+    async with engine.connect() as conn:
+        try:
+            result = await conn.execute(text("SELECT version FROM schema_version"))
+        except ProgrammingError:
+            # Таблицы ещё нет — новая база
+            return False
+        applied = set(result.scalars().all())
+    return all(migration.version in applied for migration in MIGRATIONS)
+
+
+async def run_migrations() -> None:
+    """
+    Применяет недостающие миграции по порядку версий.
+    Применённые версии хранятся в таблице schema_version.
+    """
+    if await _is_schema_current():
+        return
+
+    async with engine.connect() as lock_conn:
+        lock_conn = await lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+        await lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
+        try:
+            await lock_conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS schema_version ("
+                "version INTEGER PRIMARY KEY, "
+                "description TEXT NOT NULL, "
+                "applied_at TIMESTAMP NOT NULL DEFAULT now())"
+            ))
+            result = await lock_conn.execute(text("SELECT version FROM schema_version"))
+            applied = set(result.scalars().all())
+
+            for migration in MIGRATIONS:
+                if migration.version in applied:
+                    continue
+                logger.info("Применяем миграцию {}: {}", migration.version, migration.description)
+                if migration.transactional:
+                    async with engine.begin() as conn:
+                        await migration.apply(conn)
+                        await _record_version(conn, migration)
+                else:
+                    await migration.apply(lock_conn)
+                    await _record_version(lock_conn, migration)
+        finally:
+            await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from typing import Optional
+from loguru import logger
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolStats:
+    """
+    Статистика выдачи соединений за текущее окно логирования
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, wait: float) -> None:
+        self.checkouts += 1
+        self.wait_total += wait
+        if wait > self.wait_max:
+            self.wait_max = wait
+
+
+pool_stats = PoolStats()
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул, который замеряет, сколько обработчик ждал соединение
+    (включая открытие нового соединения при расширении пула).
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_stats.record_wait(time.perf_counter() - start)
+
+
+_stats_task: Optional[asyncio.Task] = None
+
+
+def log_pool_state(pool: TimedAsyncAdaptedQueuePool) -> None:
+    checkouts = pool_stats.checkouts
+    wait_avg = pool_stats.wait_total / checkouts if checkouts else 0.0
+    logger.info(
+        "Пул БД: занято {}, свободно {}, размер {}, overflow {} | "
+        "выдач {}, ожидание ср. {:.1f} мс, макс. {:.1f} мс",
+        pool.checkedout(), pool.checkedin(), pool.size(), pool.overflow(),
+        checkouts, wait_avg * 1000, pool_stats.wait_max * 1000
+    )
+    pool_stats.reset()
+
+
+async def _log_pool_stats_forever(pool: TimedAsyncAdaptedQueuePool, interval: int) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        log_pool_state(pool)
+
+
+def start_pool_stats_logging(pool: TimedAsyncAdaptedQueuePool, interval: int) -> None:
+    global _stats_task
+    if interval > 0 and _stats_task is None:
+        _stats_task = asyncio.create_task(_log_pool_stats_forever(pool, interval))
+
+
+async def stop_pool_stats_logging() -> None:
+    global _stats_task
+    if _stats_task is not None:
+        _stats_task.cancel()
+        try:
+            await _stats_task
+        except asyncio.CancelledError:
+            pass
+        _stats_task = None
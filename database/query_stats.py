@@ -0,0 +1,87 @@
+import re
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+
+class UpdateQueryStats:
+    """
+    Запросы к БД, выполненные при обработке одного апдейта.
+    """
+
+    __slots__ = ("handler", "statements", "rows", "db_time", "shapes")
+
+    def __init__(self):
+        self.handler: Optional[str] = None
+        self.statements = 0
+        self.rows = 0
+        self.db_time = 0.0
+        # Форма запроса -> сколько раз выполнялась
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, rows: int, elapsed: float) -> None:
+        self.statements += 1
+        self.rows += max(rows, 0)
+        self.db_time += elapsed
+        self.shapes[statement_shape(statement)] += 1
+
+    def most_repeated(self) -> Tuple[Optional[str], int]:
+        if not self.shapes:
+            return None, 0
+        return self.shapes.most_common(1)[0]
+
+
+class HandlerQueryTotals:
+    # Накопленные по обработчику значения с момента старта
+
+    __slots__ = ("updates", "statements", "rows", "db_time", "flagged")
+
+    def __init__(self):
+        self.updates = 0
+        self.statements = 0
+        self.rows = 0
+        self.db_time = 0.0
+        self.flagged = 0
+
+
+_current: ContextVar[Optional[UpdateQueryStats]] = ContextVar("update_query_stats", default=None)
+# Имя обработчика -> накопленная статистика
+handler_totals: Dict[str, HandlerQueryTotals] = {}
+
+# Списки параметров IN (...) разной длины дают одну форму
+_PARAMS_RE = re.compile(r"\$\d+(?:\s*,\s*\$\d+)*|%\(\w+\)s(?:\s*,\s*%\(\w+\)s)*|\?(?:\s*,\s*\?)*")
+
+
+@lru_cache(maxsize=1024)
+def statement_shape(statement: str) -> str:
+    return _PARAMS_RE.sub("?", " ".join(statement.split()))
+
+
+def begin_update() -> UpdateQueryStats:
+    stats = UpdateQueryStats()
+    _current.set(stats)
+    return stats
+
+
+def current() -> Optional[UpdateQueryStats]:
+    return _current.get()
+
+
+def set_handler(name: str) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.handler = name
+
+
+def end_update(stats: UpdateQueryStats, flagged: bool) -> None:
+    _current.set(None)
+    totals = handler_totals.get(stats.handler or "-")
+    if totals is None:
+        totals = handler_totals[stats.handler or "-"] = HandlerQueryTotals()
+    totals.updates += 1
+    totals.statements += stats.statements
+    totals.rows += stats.rows
+    totals.db_time += stats.db_time
+    if flagged:
+        totals.flagged += 1
@@ -1,9 +1,29 @@
+import time
+from typing import Callable
+from sqlalchemy import event, make_url
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import Session
 from config.main_conf import settings
+from database import query_stats
+from database.pool import TimedAsyncAdaptedQueuePool
+
+connect_args = {}
+if make_url(settings.db.database_url).get_driver_name() == "asyncpg":
+    connect_args = {
+        "statement_cache_size": settings.db.db_statement_cache_size,
+        "command_timeout": settings.db.db_command_timeout,
+    }
 
 engine = create_async_engine(
     settings.db.database_url,
-    echo=settings.db.sql_echo
+    echo=settings.db.sql_echo,
+    poolclass=TimedAsyncAdaptedQueuePool,
+    pool_size=settings.db.db_pool_size,
+    max_overflow=settings.db.db_max_overflow,
+    pool_timeout=settings.db.db_pool_timeout,
+    pool_recycle=settings.db.db_pool_recycle,
+    pool_pre_ping=settings.db.db_pool_pre_ping,
+    connect_args=connect_args,
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -12,3 +32,51 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+
+def after_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """
+    Откладывает callback до успешного коммита сессии. При откате он отбрасывается.
+    Используется для обновления кэшей только после того, как данные записаны.
+    """
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session: Session) -> None:
+    for callback in session.info.pop("after_commit", []):
+        callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_after_commit(session: Session) -> None:
+    session.info.pop("after_commit", None)
+
+
+# Сессия начинает транзакцию на соединении из пула — считаем такие выдачи
+@event.listens_for(Session, "after_begin")
+def _count_checkout(session: Session, transaction, connection) -> None:
+    session.info["checkouts"] = session.info.get("checkouts", 0) + 1
+
+
+# Учёт запросов текущего апдейта: число, строки и время в БД.
+# Вне обработки апдейта (миграции, фоновые задачи) ничего не считается.
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _query_started(conn, cursor, statement, parameters, context, executemany) -> None:
+    if query_stats.current() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _query_finished(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = query_stats.current()
+    started = conn.info.get("query_started")
+    if stats is not None and started:
+        stats.record(statement, cursor.rowcount, time.perf_counter() - started.pop())
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _query_failed(exception_context) -> None:
+    # after_cursor_execute для упавшего запроса не вызывается
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
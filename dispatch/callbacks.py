@@ -0,0 +1,112 @@
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+from aiogram.dispatcher.event.handler import CallableObject
+from aiogram.types import CallbackQuery
+from loguru import logger
+from models.exercise_type import ExerciseType
+
+Handler = Callable[..., Any]
+Parser = Callable[[str], Any]
+
+
+def exercise_type_payload(raw: str) -> ExerciseType:
+    # STRENGTH / strength -> ExerciseType.STRENGTH
+    return ExerciseType[raw.upper()]
+
+
+class CallbackRoute:
+    __slots__ = ("key", "handler", "parse")
+
+    def __init__(self, key: str, handler: Handler, parse: Optional[Parser]):
+        self.key = key
+        # CallableObject передаёт обработчику только те аргументы, что есть в его сигнатуре
+        self.handler = CallableObject(callback=handler)
+        self.parse = parse
+
+    @property
+    def callback(self) -> Handler:
+        return self.handler.callback
+
+
+class _Node:
+    __slots__ = ("children", "route")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.route: Optional[CallbackRoute] = None
+
+
+class CallbackRouter:
+    """
+    Маршрутизация callback_data одним обработчиком aiogram вместо цепочки фильтров
+    F.data.startswith(...) по всем роутерам.
+
+    Точные значения лежат в словаре, префиксы — в префиксном дереве: поиск стоит
+    O(длины callback_data) и не зависит от числа обработчиков. При пересечении
+    префиксов (exercise_ и exercise_type_) выбирается самый длинный. Остаток после
+    префикса разбирается один раз функцией маршрута, результат приходит
+    в обработчик аргументом payload.
+
+    Callback_data без маршрута фильтр пропускает дальше — к обычным обработчикам
+    aiogram (например, CalendarCallback.filter()).
+    """
+
+    def __init__(self):
+        self._exact: Dict[str, CallbackRoute] = {}
+        self._root = _Node()
+
+    def exact(self, data: str) -> Callable[[Handler], Handler]:
+        def decorator(handler: Handler) -> Handler:
+            if data in self._exact:
+                raise ValueError(f"Обработчик callback {data!r} уже зарегистрирован")
+            self._exact[data] = CallbackRoute(data, handler, None)
+            return handler
+        return decorator
+
+    def prefix(self, prefix: str, parse: Parser = str) -> Callable[[Handler], Handler]:
+        def decorator(handler: Handler) -> Handler:
+            node = self._root
+            for char in prefix:
+                node = node.children.setdefault(char, _Node())
+            if node.route is not None:
+                raise ValueError(f"Обработчик callback-префикса {prefix!r} уже зарегистрирован")
+            node.route = CallbackRoute(prefix, handler, parse)
+            return handler
+        return decorator
+
+    def resolve(self, data: str) -> Optional[Tuple[CallbackRoute, str]]:
+        route = self._exact.get(data)
+        if route is not None:
+            return route, ""
+        node, found, end = self._root, None, 0
+        for i, char in enumerate(data):
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.route is not None:
+                found, end = node.route, i + 1
+        if found is None:
+            return None
+        return found, data[end:]
+
+    async def filter(self, callback: CallbackQuery) -> Union[bool, Dict[str, Any]]:
+        resolved = self.resolve(callback.data) if callback.data else None
+        if resolved is None:
+            return False
+        route, raw = resolved
+        return {"callback_route": route, "callback_raw": raw}
+
+    async def dispatch(
+        self, callback: CallbackQuery, callback_route: CallbackRoute, callback_raw: str, **data: Any
+    ) -> Any:
+        payload = None
+        if callback_route.parse is not None:
+            try:
+                payload = callback_route.parse(callback_raw)
+            except (ValueError, KeyError) as e:
+                logger.error("Неверные данные кнопки: {} | {!r}", callback.data, e)
+                await callback.answer("❌ Неверные данные кнопки.", show_alert=True)
+                return None
+        return await callback_route.handler.call(callback, payload=payload, **data)
+
+
+callbacks = CallbackRouter()
@@ -0,0 +1,78 @@
+import importlib
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject
+from loguru import logger
+
+
+class RouterRegistry:
+    """
+    Подключает роутеры обработчиков по именам модулей (в каждом — переменная router).
+
+    В ленивом режиме модули импортируются при первом апдейте, и их импорт
+    оплачивает первый пользователь. Выигрыш невелик: тяжёлые зависимости
+    (aiogram.types, SQLAlchemy, модели, клавиатуры) импортируются при старте
+    через bot, middleware и web.metrics. Типы апдейтов для allowed_updates в
+    этом режиме задаются явно, а не выводятся из ещё не загруженных роутеров.
+    """
+
+    def __init__(self, modules: Sequence[str], update_types: List[str]):
+        self.modules = list(modules)
+        self.update_types = update_types
+        # Время импорта каждого модуля, секунды
+        self.import_times: Dict[str, float] = {}
+        self.loaded = False
+
+    def load(self, dp: Dispatcher) -> None:
+        if self.loaded:
+            return
+        # Импорт синхронный, поэтому два апдейта не начнут загрузку одновременно
+        self.loaded = True
+        for name in self.modules:
+            started = time.perf_counter()
+            module = importlib.import_module(name)
+            self.import_times[name] = time.perf_counter() - started
+            dp.include_router(module.router)
+
+        used = set(dp.resolve_used_update_types())
+        missing = used - set(self.update_types)
+        if missing:
+            logger.warning("Обработчики используют типы апдейтов не из allowed_updates: {}", sorted(missing))
+
+    def allowed_updates(self, dp: Dispatcher) -> List[str]:
+        # После загрузки — типы, которые действительно обрабатывают роутеры
+        if self.loaded:
+            return dp.resolve_used_update_types()
+        return self.update_types
+
+    def log_import_times(self, detailed: bool = False) -> None:
+        total = sum(self.import_times.values())
+        # Только сами модули handlers: их зависимости к этому моменту уже импортированы
+        logger.info("Модули обработчиков импортированы за {:.3f} с", total)
+        if detailed:
+            for name, elapsed in sorted(self.import_times.items(), key=lambda item: item[1], reverse=True):
+                logger.info("  {}: {:.1f} мс", name, elapsed * 1000)
+
+    def middleware(self, dp: Dispatcher, detailed: bool = False) -> BaseMiddleware:
+        return _LazyRoutersMiddleware(self, dp, detailed)
+
+
+class _LazyRoutersMiddleware(BaseMiddleware):
+    # Внешний middleware на dp.update: подключает роутеры перед первым апдейтом
+
+    def __init__(self, registry: RouterRegistry, dp: Dispatcher, detailed: bool):
+        self.registry = registry
+        self.dp = dp
+        self.detailed = detailed
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not self.registry.loaded:
+            self.registry.load(self.dp)
+            self.registry.log_import_times(self.detailed)
+        return await handler(event, data)
@@ -3,85 +3,72 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 from aiogram.filters import Command
 
-from database.connection import connection
 from keyboards.main_menu import MAIN_MENU_TEXT
 from states.workout_states import WorkoutStates
 from keyboards.workout import workout_menu_kb, workout_confirm_kb, generate_calendar_kb, add_exercise_kb
-from crud.workout import create_workout, get_user_workouts, get_workout_by_id, get_workout_by_user_and_date, get_workout_details
+from crud.workout import create_workout, get_user_workouts, get_workout_by_id, get_workout_details, \
+    get_workout_details_by_date, get_workout_dates_by_month, log_sets
 from crud.exercise import get_exercises_by_type, get_exercise_by_id
+from cache.workout_view import apply_logged_sets
 from loguru import logger
 from aiogram.types import CallbackQuery
-from telegram_calendar import build_calendar, CalendarCallback
+from telegram_calendar import CalendarCallback
+from keyboards.calendar import get_calendar, get_month_selector, get_year_selector
 from typing import Dict
 from datetime import datetime
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from schemas.workout import WorkoutCreateSchema
 from keyboards.exercise import build_exercise_keyboard, build_exercise_type_keyboard
+from renderers.workout import render_workout
+from client.edit import edit_message
+from dispatch.callbacks import callbacks, exercise_type_payload
+from models.exercise_type import ExerciseType
 
 router = Router()
 
 
+async def answer_workout(message: Message, workout_details: dict, session) -> None:
+    # Длинная тренировка уходит несколькими сообщениями, клавиатура — под последним
+    *head, last = render_workout(workout_details, session)
+    for chunk in head:
+        await message.answer(chunk)
+    await message.answer(last, reply_markup=add_exercise_kb)
+
+
+async def get_icon_dates(session, user_id: int, year: int, month: int) -> Dict[str, str]:
+    dates = await get_workout_dates_by_month(session, user_id=user_id, year=year, month=month)
+    # Заменяем дату на иконку кубка
+    return {str(d): "🏆" for d in dates}
+
+
 @router.message(Command("workouts"))
-@connection
 async def workouts_calendar(message: Message, state: FSMContext, session):
-    logger.info(f"Пользователь {message.from_user.id} открыл календарь тренировок")
+    logger.info("Пользователь {} открыл календарь тренировок", message.from_user.id)
     now = datetime.now()
-    workouts = await get_user_workouts(session, user_id=message.from_user.id)
-    icon_dates: Dict[str, str] = {}
-    for w in workouts:
-        # Заменяем дату на иконку кубка
-        icon_dates[str(w.date)] = "🏆"
-    calendar = build_calendar(now.year, now.month, icon_dates=icon_dates)
+    icon_dates = await get_icon_dates(session, message.from_user.id, now.year, now.month)
+    calendar = get_calendar(now.year, now.month, icon_dates=icon_dates)
     await message.answer("Выберите дату для создания тренировки:", reply_markup=calendar)
     await state.clear()
 
 @router.callback_query(CalendarCallback.filter())
-@connection
 async def process_calendar_selection(call: CallbackQuery, callback_data: CalendarCallback, state: FSMContext, session):
-    logger.info(f"Пользователь {call.from_user.id} выбрал дату через календарь: {callback_data}")
+    logger.info("Пользователь {} выбрал дату через календарь: {}", call.from_user.id, callback_data)
     action = callback_data.action
     year = callback_data.year
     month = callback_data.month
     day = getattr(callback_data, "day", 0)
-    workouts = await get_user_workouts(session, user_id=call.from_user.id)
-    icon_dates: Dict[str, str] = {}
-    for w in workouts:
-        # Используем такую же иконку при обновлении календаря
-        icon_dates[str(w.date)] = "🏆"
     if action == "select_day" and day > 0:
         date = datetime(year, month, day).date()
-        workout = await get_workout_by_user_and_date(session, user_id=call.from_user.id, date=date)
-        if workout:
+        workout_details = await get_workout_details_by_date(session, user_id=call.from_user.id, date=date)
+        if workout_details:
             try:
-                workout_details = await get_workout_details(session=session, workout=workout)
-
-                # Формируем текст с информацией о тренировке
-                text = f"Тренировка на {date.strftime('%d.%m.%Y')}\nЗаметка: {workout.comment or '-'}\n\nУпражнения:"
-
-                # Упражнения уже отсортированы в порядке добавления (старые вверху, новые внизу)
-                for exercise in workout_details["exercises"]:
-                    text += f"\n\n🔹 {exercise['name']} ({exercise['type']})"
-                    if exercise['reps']:
-                        if exercise['type'] == 'CARDIO':
-                            text += "\nВремя:"
-                        else:
-                            text += "\nПодходы:"
-                        # Подходы отсортированы в порядке добавления
-                        for i, rep in enumerate(exercise['reps'], 1):
-                            if exercise['type'] == 'CARDIO':
-                                text += f"\n⏱ {rep.get('duration', 0)} мин"
-                            else:
-                                text += f"\n💪 {rep['weight']}кг x {rep['count']}"
-                    else:
-                        if exercise['type'] == 'CARDIO':
-                            text += "\nВремя не указано"
-                        else:
-                            text += "\nНет записанных подходов"
-
-                await call.message.answer(text, reply_markup=add_exercise_kb)
-                logger.info(f"Пользователь {call.from_user.id} просмотрел тренировку на дату {date}")
+                # Дальнейший ввод подходов будет дописывать это представление без перечитывания
+                await state.update_data(workout_view=workout_details)
+
+                await answer_workout(call.message, workout_details, session)
+                logger.info("Пользователь {} просмотрел тренировку на дату {}", call.from_user.id, date)
             except Exception as e:
-                logger.error(f"Ошибка при получении деталей тренировки: {e}")
+                logger.error("Ошибка при получении деталей тренировки: {}", e)
                 await call.message.answer("Произошла ошибка при получении деталей тренировки.")
         else:
             await state.set_state(WorkoutStates.adding_exercises)
@@ -91,37 +78,31 @@ async def process_calendar_selection(call: CallbackQuery, callback_data: Calenda
                 f"Дата тренировки: {date.strftime('%d.%m.%Y')}\nТеперь вы можете добавить упражнения.",
                 reply_markup=add_exercise_kb
             )
-            logger.info(f"Пользователь {call.from_user.id} начал добавление тренировки на дату {date}")
+            logger.info("Пользователь {} начал добавление тренировки на дату {}", call.from_user.id, date)
         await call.answer()
     elif action in ("select_month", "show_months"):
-        calendar = build_calendar(year, month, icon_dates=icon_dates)
-        await call.message.edit_reply_markup(reply_markup=calendar)
+        icon_dates = await get_icon_dates(session, call.from_user.id, year, month)
+        calendar = get_calendar(year, month, icon_dates=icon_dates)
+        await edit_message(call.message, reply_markup=calendar)
         await call.answer()
-    elif action == "show_years":
-        from telegram_calendar import build_year_selector
-        calendar = build_year_selector(year)
-        await call.message.edit_reply_markup(reply_markup=calendar)
+    elif action in ("show_years", "change_year_range"):
+        calendar = get_year_selector(year)
+        await edit_message(call.message, reply_markup=calendar)
         await call.answer()
     elif action == "select_year":
-        from telegram_calendar import build_month_selector
-        calendar = build_month_selector(year)
-        await call.message.edit_reply_markup(reply_markup=calendar)
-        await call.answer()
-    elif action == "change_year_range":
-        from telegram_calendar import build_year_selector
-        calendar = build_year_selector(year)
-        await call.message.edit_reply_markup(reply_markup=calendar)
+        calendar = get_month_selector(year)
+        await edit_message(call.message, reply_markup=calendar)
         await call.answer()
     else:
         await call.answer()
 
 @router.message(WorkoutStates.adding_exercises, F.text == "Добавить упражнение")
 async def add_exercise(message: Message, state: FSMContext):
-    logger.info(f"Пользователь {message.from_user.id} выбрал добавить упражнение")
+    logger.info("Пользователь {} выбрал добавить упражнение", message.from_user.id)
     await state.set_state(WorkoutStates.choosing_exercise_type)
     await message.answer("Выберите тип упражнения:", reply_markup=build_exercise_type_keyboard())
 
-@router.callback_query(F.data == "add_exercise")
+@callbacks.exact("add_exercise")
 async def add_exercise_inline(call: CallbackQuery, state: FSMContext):
     # Сохраняем дату из текущей тренировки
     data = await state.get_data()
@@ -131,57 +112,57 @@ async def add_exercise_inline(call: CallbackQuery, state: FSMContext):
         message_text = call.message.text
         if "Тренировка на" in message_text:
             try:
-                date_str = message_text.split("Тренировка на")[1].split("\n")[0].strip()
+                date_str = message_text.split("Тренировка на")[1].split()[0]
                 date = datetime.strptime(date_str, "%d.%m.%Y").date()
                 await state.update_data(date=date)
             except Exception as e:
-                logger.error(f"Ошибка при извлечении даты: {e}")
+                logger.error("Ошибка при извлечении даты: {}", e)
                 await call.answer("Не удалось определить дату тренировки", show_alert=True)
                 return
 
     # Переходим к выбору типа упражнения для тренировки
     await state.set_state(WorkoutStates.choosing_exercise_type)
-    await call.message.edit_text(
+    await edit_message(
+        call.message,
         "Выберите тип упражнения для добавления в тренировку:",
         reply_markup=build_exercise_type_keyboard(for_workout=True)
     )
     await call.answer()
 
-@router.callback_query(F.data.startswith("workout_type_"))
-@connection
-async def choose_exercise_type(call: CallbackQuery, state: FSMContext, session):
+@callbacks.prefix("workout_type_", exercise_type_payload)
+async def choose_exercise_type(call: CallbackQuery, state: FSMContext, session, payload: ExerciseType):
     """Обработчик выбора типа упражнения при добавлении в тренировку"""
     current_state = await state.get_state()
     if current_state != WorkoutStates.choosing_exercise_type:
-        logger.info(f"Игнорируем workout_type_ callback в неправильном состоянии: {current_state}")
-        return False
+        logger.info("Игнорируем workout_type_ callback в неправильном состоянии: {}", current_state)
+        await call.answer()
+        return
 
-    # workout_type_STRENGTH -> STRENGTH (уже в верхнем регистре)
-    exercise_type = call.data.split("_")[-1]
-    logger.info(f"Пользователь {call.from_user.id} выбрал тип упражнения для тренировки: {exercise_type}")
+    exercise_type = payload.value
+    logger.info("Пользователь {} выбрал тип упражнения для тренировки: {}", call.from_user.id, exercise_type)
     await state.update_data(exercise_type=exercise_type)
     await state.set_state(WorkoutStates.choosing_exercise)
 
-    page = 0
     page_size = 5
-    exercises, total = await get_exercises_by_type(session, exercise_type, call.from_user.id, page, page_size)
+    page = await get_exercises_by_type(session, exercise_type, call.from_user.id, page_size)
 
-    await call.message.edit_text(
+    await edit_message(
+        call.message,
         "Выберите упражнение для добавления в тренировку:",
-        reply_markup=build_exercise_keyboard(exercises, page, total, page_size, for_workout=True)
+        reply_markup=build_exercise_keyboard(page.exercises, page.prev_cursor, page.next_cursor, for_workout=True)
     )
     await call.answer()
 
 
-@router.callback_query(F.data.startswith("workout_exercise_"))
-@connection
-async def choose_workout_exercise(call: CallbackQuery, state: FSMContext, session):
-    exercise_id = int(call.data.split("_")[-1])
-    logger.info(f"Пользователь {call.from_user.id} выбрал упражнение для тренировки: {exercise_id}")
+@callbacks.prefix("workout_exercise_", int)
+async def choose_workout_exercise(call: CallbackQuery, state: FSMContext, session, payload: int):
+    exercise_id = payload
+    logger.info("Пользователь {} выбрал упражнение для тренировки: {}", call.from_user.id, exercise_id)
 
     current_state = await state.get_state()
     if current_state != WorkoutStates.choosing_exercise:
-        logger.warning(f"Неверное состояние для добавления упражнения: {current_state}")
+        logger.warning("Неверное состояние для добавления упражнения: {}", current_state)
+        await call.answer()
         return
 
     data = await state.get_data()
@@ -189,7 +170,7 @@ async def choose_workout_exercise(call: CallbackQuery, state: FSMContext, sessio
         await call.answer("Сначала выберите дату тренировки", show_alert=True)
         return
 
-    exercise = await get_exercise_by_id(session, exercise_id)
+    exercise = await get_exercise_by_id(session, exercise_id, user_id=call.from_user.id)
     if not exercise:
         await call.answer("Упражнение не найдено", show_alert=True)
         return
@@ -209,55 +190,25 @@ async def choose_workout_exercise(call: CallbackQuery, state: FSMContext, sessio
             "(вес пробел количество повторов, перевод строки — новый подход)"
         )
 
-    await call.message.edit_text(message_text)
+    await edit_message(call.message, message_text)
     await call.answer()
 
 @router.message(WorkoutStates.entering_sets)
-@connection
 async def enter_sets(message: Message, state: FSMContext, session):
-    logger.info(f"Пользователь {message.from_user.id} ввёл подходы: {message.text}")
+    logger.info("Пользователь {} ввёл подходы: {}", message.from_user.id, message.text)
     data = await state.get_data()
 
     if "date" not in data or "exercise_id" not in data:
-        logger.error(f"Нет даты или упражнения в state для пользователя {message.from_user.id}: {data}")
+        logger.error("Нет даты или упражнения в state для пользователя {}: {}", message.from_user.id, data)
         await message.answer("Ошибка: не выбрана дата или упражнение. Пожалуйста, начните с выбора даты через календарь.")
         await state.clear()
         return
 
-    workout = await get_workout_by_user_and_date(session, user_id=message.from_user.id, date=data["date"])
-    if not workout:
-        workout = await create_workout(
-            session=session,
-            user_id=message.from_user.id,
-            data=WorkoutCreateSchema(date=data["date"], note=data.get("comment"))
-        )
-
     # Получаем тип упражнения
-    exercise = await get_exercise_by_id(session, data["exercise_id"])
+    exercise = await get_exercise_by_id(session, data["exercise_id"], user_id=message.from_user.id)
     is_cardio = exercise.type.value == "CARDIO"
 
-    # Сохраняем упражнение в workout_exercises
-    from crud.rep import create_reps
-    from models.workout_exercise import WorkoutExercise
-    from sqlalchemy import select
-
-    result = await session.execute(
-        select(WorkoutExercise).where(
-            WorkoutExercise.workout_id == workout.id,
-            WorkoutExercise.exercise_id == data["exercise_id"]
-        )
-    )
-    workout_exercise = result.scalar_one_or_none()
-    if not workout_exercise:
-        workout_exercise = WorkoutExercise(
-            workout_id=workout.id,
-            exercise_id=data["exercise_id"]
-        )
-        session.add(workout_exercise)
-        await session.commit()
-        await session.refresh(workout_exercise)
-
-    # Парсим подходы
+    # Парсим подходы до записи в БД, чтобы ошибка ввода ничего не создавала
     reps = []
     if is_cardio:
         try:
@@ -275,39 +226,33 @@ async def enter_sets(message: Message, state: FSMContext, session):
                     count = int(parts[1])
                     reps.append({"weight": weight, "count": count})
                 except Exception as e:
-                    logger.warning(f"Ошибка парсинга подхода: {line} ({e})")
-
-    if reps:
-        await create_reps(session, workout_exercise.id, reps)
-
-    # Получаем обновленные данные тренировки и показываем их
-    workout_details = await get_workout_details(session=session, workout=workout)
-    text = f"Тренировка на {workout.date.strftime('%d.%m.%Y')}\nЗаметка: {workout.comment or '-'}\n\nУпражнения:"
-
-    for ex in workout_details["exercises"]:
-        text += f"\n\n🔹 {ex['name']} ({ex['type']})"
-        if ex['reps']:
-            if ex['type'] == 'CARDIO':
-                text += "\nВремя:"
-                for rep in ex['reps']:
-                    text += f"\n{rep.get('duration', 0)} мин"
-            else:
-                text += "\nПодходы:"
-                for rep in ex['reps']:
-                    text += f"\n{rep['weight']}кг x {rep['count']}"
-        else:
-            text += "\nПодходы не указаны"
-
+                    logger.warning("Ошибка парсинга подхода: {} ({})", line, e)
+
+    # Тренировка, упражнение в ней и подходы — одной транзакцией
+    logged = await log_sets(
+        session,
+        user_id=message.from_user.id,
+        date=data["date"],
+        exercise_id=data["exercise_id"],
+        reps=reps
+    )
 
-    # Используем reply_markup для отображения клавиатуры
-    await message.answer(text, reply_markup=add_exercise_kb)
+    # Дописываем новые подходы в представление тренировки; из БД читаем,
+    # только если его нет или тренировку меняли в обход него
+    workout_details = apply_logged_sets(
+        data.get("workout_view"), logged, message.from_user.id, data["date"], exercise, reps
+    )
+    if workout_details is None:
+        workout_details = await get_workout_details(session=session, workout_id=logged.workout_id)
+    await state.update_data(workout_view=workout_details)
+    await answer_workout(message, workout_details, session)
     await state.set_state(WorkoutStates.adding_exercises)
 
 
 # Календарь и главное меню
 @router.message(WorkoutStates.adding_exercises, F.text.in_(["Календарь", "Главная"]))
 async def workout_nav_keyboard(message: Message, state: FSMContext):
-    logger.info(f"Пользователь {message.from_user.id} выбрал: {message.text}")
+    logger.info("Пользователь {} выбрал: {}", message.from_user.id, message.text)
     await state.clear()
     if message.text == "Календарь":
         await message.answer("Выберите дату для создания тренировки:", reply_markup=generate_calendar_kb())
@@ -317,7 +262,7 @@ async def workout_nav_keyboard(message: Message, state: FSMContext):
 # Начало добавления тренировки
 @router.message(F.text == "Добавить тренировку")
 async def add_workout_start(message: Message, state: FSMContext):
-    logger.info(f"Пользователь {message.from_user.id} начал добавление тренировки")
+    logger.info("Пользователь {} начал добавление тренировки", message.from_user.id)
     await state.set_state(WorkoutStates.choosing_date)
     await message.answer("Введите дату тренировки в формате ГГГГ-ММ-ДД:", reply_markup=types.ReplyKeyboardRemove())
 
@@ -330,7 +275,7 @@ async def add_workout_date(message: Message, state: FSMContext):
         await state.set_state(WorkoutStates.entering_note)
         await message.answer("Добавьте заметку к тренировке (или напишите - для пропуска):")
     except ValueError:
-        logger.warning(f"Некорректная дата: {message.text}")
+        logger.warning("Некорректная дата: {}", message.text)
         await message.answer("Неверный формат. Введите в формате ГГГГ-ММ-ДД:")
 
 # Ввод заметки
@@ -343,13 +288,21 @@ async def add_workout_note(message: Message, state: FSMContext):
 
 # Подтверждение сохранения
 @router.message(WorkoutStates.confirming, F.text == "Сохранить тренировку")
-@connection
 async def add_workout_save(message: Message, state: FSMContext, session):
     data = await state.get_data()
-    await create_workout(session, user_id=message.from_user.id, data=WorkoutCreateSchema(date=data["date"], note=data["note"]))
+    workout_data = WorkoutCreateSchema(date=data["date"], comment=data["note"])
+    workout = await create_workout(session, user_id=message.from_user.id, data=workout_data)
     await state.clear()
+    if workout is None:
+        logger.info("У пользователя {} уже есть тренировка на {}", message.from_user.id, workout_data.date)
+        await message.answer(
+            f"На {workout_data.date.strftime('%d.%m.%Y')} уже есть тренировка. "
+            "Откройте её в календаре, чтобы добавить упражнения.",
+            reply_markup=workout_menu_kb
+        )
+        return
     await message.answer("Тренировка добавлена!", reply_markup=workout_menu_kb)
-    logger.info(f"Тренировка сохранена для пользователя {message.from_user.id}")
+    logger.info("Тренировка сохранена для пользователя {}", message.from_user.id)
 
 # Отмена
 @router.message(WorkoutStates.confirming, F.text == "Отмена")
@@ -359,9 +312,8 @@ async def add_workout_cancel(message: Message, state: FSMContext):
 
 # Список тренировок
 @router.message(F.text == "Список тренировок")
-@connection
 async def list_workouts(message: Message, state: FSMContext, session):
-    workouts = await get_user_workouts(user_id=message.from_user.id)
+    workouts = await get_user_workouts(session, user_id=message.from_user.id)
     if not workouts:
         await message.answer("У вас нет тренировок.", reply_markup=workout_menu_kb)
         return
@@ -381,7 +333,6 @@ async def back_to_main_menu(message: Message, state: FSMContext):
     await message.answer("Главное меню", reply_markup=MAIN_MENU_TEXT)
 
 # Просмотр тренировки
-@connection
 @router.message(F.text.regexp(r"^\d+:"))
 async def view_workout(message: Message, state: FSMContext, session):
     try:
@@ -399,8 +350,8 @@ async def view_workout(message: Message, state: FSMContext, session):
     text = f"Тренировка №{workout.id}\nДата: {workout.date}\nЗаметка: {workout.comment or '-'}"
     kb = ReplyKeyboardMarkup(
         keyboard=[
-            [KeyboardButton("Редактировать"), KeyboardButton("Удалить")],
-            [KeyboardButton("Назад к списку тренировок")]
+            [KeyboardButton(text="Редактировать"), KeyboardButton(text="Удалить")],
+            [KeyboardButton(text="Назад к списку тренировок")]
         ],
         resize_keyboard=True
     )
@@ -408,9 +359,8 @@ async def view_workout(message: Message, state: FSMContext, session):
 
 # Назад к списку тренировок
 @router.message(F.text == "Назад к списку тренировок")
-@connection
 async def back_to_workout_list(message: Message, state: FSMContext, session):
-    workouts = await get_user_workouts(user_id=message.from_user.id)
+    workouts = await get_user_workouts(session, user_id=message.from_user.id)
     if not workouts:
         await message.answer("У вас нет тренировок.", reply_markup=workout_menu_kb)
         return
@@ -428,70 +378,39 @@ async def back_to_workout_list(message: Message, state: FSMContext, session):
 async def show_add_exercise_inline(message: Message, state: FSMContext):
     kb = InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton("Добавить упражнение", callback_data="add_exercise")],
-            [InlineKeyboardButton("Календарь", callback_data="calendar")],
-            [InlineKeyboardButton("Главная", callback_data="main_menu")],
+            [InlineKeyboardButton(text="Добавить упражнение", callback_data="add_exercise")],
+            [InlineKeyboardButton(text="Календарь", callback_data="calendar")],
+            [InlineKeyboardButton(text="Главная", callback_data="main_menu")],
         ]
     )
     await message.answer("Выберите действие:", reply_markup=kb)
 
-# Инлайн: добавить упражнение
-@router.callback_query(F.data == "add_exercise")
-async def add_exercise_inline(call: CallbackQuery, state: FSMContext):
-    # Сохраняем дату из текущей тренировки
-    data = await state.get_data()
-
-    if not data.get("date"):
-        # Пытаемся извлечь дату из текста сообщения
-        message_text = call.message.text
-        if "Тренировка на" in message_text:
-            try:
-                date_str = message_text.split("Тренировка на")[1].split("\n")[0].strip()
-                date = datetime.strptime(date_str, "%d.%m.%Y").date()
-                await state.update_data(date=date)
-            except Exception as e:
-                logger.error(f"Ошибка при извлечении даты: {e}")
-                await call.answer("Не удалось определить дату тренировки", show_alert=True)
-                return
-
-    # Переходим к выбору типа упражнения для тренировки
-    await state.set_state(WorkoutStates.choosing_exercise_type)
-    await call.message.edit_text(
-        "Выберите тип упражнения для добавления в тренировку:",
-        reply_markup=build_exercise_type_keyboard(for_workout=True)
-    )
-    await call.answer()
-
 # Инлайн: вернуться к календарю
-@router.callback_query(F.data == "calendar")
-@connection
+@callbacks.exact("calendar")
 async def back_to_calendar_inline(call: CallbackQuery, state: FSMContext, session):
     now = datetime.now()
-    workouts = await get_user_workouts(session=session, user_id=call.from_user.id)
-    icon_dates: Dict[str, str] = {}
-    for w in workouts:
-        icon_dates[str(w.date)] = "🏆"
-    calendar = build_calendar(now.year, now.month, icon_dates=icon_dates)
+    icon_dates = await get_icon_dates(session, call.from_user.id, now.year, now.month)
+    calendar = get_calendar(now.year, now.month, icon_dates=icon_dates)
     await state.clear()
-    await call.message.edit_text("Выберите дату для создания тренировки:", reply_markup=calendar)
+    await edit_message(call.message, "Выберите дату для создания тренировки:", reply_markup=calendar)
     await call.answer()
 
 # Инлайн: вернуться в главное меню
-@router.callback_query(F.data == "main_menu")
+@callbacks.exact("main_menu")
 async def back_to_main_inline(call: CallbackQuery, state: FSMContext):
     await state.clear()
     await call.message.answer(MAIN_MENU_TEXT)
     await call.answer()
 
-@router.callback_query(F.data.startswith("workout_add_exercise_"))
-@connection
-async def add_exercise_to_workout(call: CallbackQuery, state: FSMContext, session):
-    exercise_id = int(call.data.split("_")[-1])
-    logger.info(f"Пользователь {call.from_user.id} выбрал упражнение для тренировки: {exercise_id}")
+@callbacks.prefix("workout_add_exercise_", int)
+async def add_exercise_to_workout(call: CallbackQuery, state: FSMContext, session, payload: int):
+    exercise_id = payload
+    logger.info("Пользователь {} выбрал упражнение для тренировки: {}", call.from_user.id, exercise_id)
 
     current_state = await state.get_state()
     if current_state != WorkoutStates.choosing_exercise:
-        logger.warning(f"Неверное состояние для добавления упражнения: {current_state}")
+        logger.warning("Неверное состояние для добавления упражнения: {}", current_state)
+        await call.answer()
         return
 
     data = await state.get_data()
@@ -499,7 +418,7 @@ async def add_exercise_to_workout(call: CallbackQuery, state: FSMContext, sessio
         await call.answer("Сначала выберите дату тренировки", show_alert=True)
         return
 
-    exercise = await get_exercise_by_id(session, exercise_id)
+    exercise = await get_exercise_by_id(session, exercise_id, user_id=call.from_user.id)
     if not exercise:
         await call.answer("Упражнение не найдено", show_alert=True)
         return
@@ -519,5 +438,5 @@ async def add_exercise_to_workout(call: CallbackQuery, state: FSMContext, sessio
             "(вес пробел количество повторов, каждый подход с новой строки)"
         )
 
-    await call.message.edit_text(message_text)
+    await edit_message(call.message, message_text)
     await call.answer()
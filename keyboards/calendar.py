@@ -0,0 +1,41 @@
+from typing import Dict, Optional
+from aiogram.types import InlineKeyboardMarkup
+from telegram_calendar import build_calendar, build_month_selector, build_year_selector
+from cache.lru import LRUCache
+
+# Готовые клавиатуры календаря. Клавиатура зависит только от аргументов,
+# поэтому её можно переиспользовать между пользователями и сообщениями.
+_keyboards = LRUCache(maxsize=2048)
+
+
+def get_calendar(year: int, month: int, icon_dates: Optional[Dict[str, str]] = None) -> InlineKeyboardMarkup:
+    # Отпечаток отмеченных дат: одинаковые наборы дают один и тот же ключ
+    fingerprint = tuple(sorted(icon_dates.items())) if icon_dates else ()
+    key = ("calendar", year, month, fingerprint)
+    keyboard = _keyboards.get(key)
+    if keyboard is None:
+        keyboard = build_calendar(year, month, icon_dates=icon_dates)
+        _keyboards.set(key, keyboard)
+    return keyboard
+
+
+def get_year_selector(year: int) -> InlineKeyboardMarkup:
+    key = ("years", year)
+    keyboard = _keyboards.get(key)
+    if keyboard is None:
+        keyboard = build_year_selector(year)
+        _keyboards.set(key, keyboard)
+    return keyboard
+
+
+def get_month_selector(year: int) -> InlineKeyboardMarkup:
+    key = ("months", year)
+    keyboard = _keyboards.get(key)
+    if keyboard is None:
+        keyboard = build_month_selector(year)
+        _keyboards.set(key, keyboard)
+    return keyboard
+
+
+def get_cache_stats() -> Dict[str, int]:
+    return {"hits": _keyboards.hits, "misses": _keyboards.misses, "size": len(_keyboards)}
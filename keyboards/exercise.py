@@ -1,7 +1,7 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 
-def build_exercise_keyboard(exercises, page: int, total: int, page_size: int, for_workout: bool = False) -> InlineKeyboardMarkup:
+def build_exercise_keyboard(exercises, prev_cursor: str = None, next_cursor: str = None, for_workout: bool = False) -> InlineKeyboardMarkup:
     keyboard = []
 
     # Список упражнений
@@ -16,18 +16,18 @@ def build_exercise_keyboard(exercises, page: int, total: int, page_size: int, fo
 
     # Кнопки навигации
     nav_buttons = []
-    if page > 0:
+    if prev_cursor:
         nav_buttons.append(
             InlineKeyboardButton(
                 text="⬅️ Назад",
-                callback_data=f"exercises_page_{page - 1}"
+                callback_data=f"exercises_page_{prev_cursor}"
             )
         )
-    if (page + 1) * page_size < total:
+    if next_cursor:
         nav_buttons.append(
             InlineKeyboardButton(
                 text="Вперед ➡️",
-                callback_data=f"exercises_page_{page + 1}"
+                callback_data=f"exercises_page_{next_cursor}"
             )
         )
 
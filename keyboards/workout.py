@@ -1,7 +1,7 @@
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from datetime import date, timedelta
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from telegram_calendar import build_calendar
+from keyboards.calendar import get_calendar
 
 # Клавиатура для меню тренировок
 workout_menu_kb = ReplyKeyboardMarkup(
@@ -26,7 +26,7 @@ workout_confirm_kb = ReplyKeyboardMarkup(
 def generate_calendar_kb(base_date: date = None):
     if base_date is None:
         base_date = date.today()
-    return build_calendar(base_date.year, base_date.month)
+    return get_calendar(base_date.year, base_date.month)
 
 # Клавиатура для этапа добавления упражнений
 add_exercise_kb = InlineKeyboardMarkup(
@@ -1,30 +1,110 @@
+import time
+
+# Отсчёт холодного старта — до импорта aiogram и SQLAlchemy, которые стоят дороже всего
+process_started = time.perf_counter()
+
 import asyncio
-from bot import bot, dp
+from bot import bot, dp, scheduler, storage
+from config.logging_setup import setup_logging
+from config.main_conf import settings
 from database.init_db import create_tables_and_exercises
-from handlers import start, workouts, exercises
+from database.pool import start_pool_stats_logging, stop_pool_stats_logging
+from database.session import engine
+from dispatch.callbacks import callbacks
+from handlers.registry import RouterRegistry
 from loguru import logger
+from middlewares.database import CommitBeforeRequestMiddleware, DbSessionMiddleware
+from middlewares.metrics import HandlerMetricsMiddleware
+from middlewares.query_stats import HandlerNameMiddleware, QueryStatsMiddleware
+from middlewares.user import UserRegistrationMiddleware
+from web.metrics import register_runtime_gauges, start_metrics_server, stop_metrics_server
+from web.webhook import run_webhook
+
+# Роутеры в порядке подключения и типы апдейтов, которые они обрабатывают
+routers = RouterRegistry(
+    ["handlers.start", "handlers.workouts", "handlers.exercises"],
+    update_types=["message", "callback_query"],
+)
 
 
 async def on_startup():
-    logger.info("Успешно стартовали ✅")
+    started = time.perf_counter()
     await create_tables_and_exercises()
+    db_ready = time.perf_counter()
+    await storage.load_snapshot()
+    storage.start_snapshots()
+    start_pool_stats_logging(engine.pool, settings.db.db_pool_stats_interval)
+    if settings.metrics.metrics_enabled:
+        await start_metrics_server(settings.metrics.metrics_host, settings.metrics.metrics_port)
+    finished = time.perf_counter()
+    logger.info(
+        "Успешно стартовали ✅ за {:.3f} с (БД {:.3f} с, FSM {:.3f} с)",
+        finished - started, db_ready - started, finished - db_ready
+    )
+
+    cold_start = finished - process_started
+    if cold_start > settings.startup.cold_start_budget:
+        logger.warning(
+            "Холодный старт {:.3f} с превысил бюджет {:.1f} с", cold_start, settings.startup.cold_start_budget
+        )
+    else:
+        logger.info("Холодный старт: {:.3f} с", cold_start)
+
+
+async def on_shutdown():
+    await stop_metrics_server()
+    await stop_pool_stats_logging()
+    # Закрываем соединения пула, чтобы не оставлять висящих сессий в Postgres
+    await engine.dispose()
+    logger.info("Соединения с БД закрыты.")
+    # Дописываем очередь фоновых приёмников логов
+    await logger.complete()
+
+
+def setup_dispatcher() -> None:
+    # Middleware и роутеры; используется и ботом, и бенчмарками
+    if settings.startup.lazy_routers:
+        dp.update.outer_middleware(routers.middleware(dp, detailed=settings.startup.profile_imports))
+    else:
+        routers.load(dp)
+        routers.log_import_times(detailed=settings.startup.profile_imports)
+
+    # Очередь апдейтов по чатам — events_isolation диспетчера (bot.py), она
+    # охватывает все outer middleware. Здесь: учёт запросов, затем сессия БД
+    # на каждый апдейт и регистрация пользователя
+    dp.update.outer_middleware(QueryStatsMiddleware(settings.db.db_query_budget, settings.db.db_query_repeat_limit))
+    dp.update.outer_middleware(DbSessionMiddleware())
+    bot.session.middleware(CommitBeforeRequestMiddleware())
+    dp.update.outer_middleware(UserRegistrationMiddleware())
+    # Один обработчик callback_query для маршрутов CallbackRouter: он проверяется раньше
+    # роутеров модулей, маршруты появляются при их импорте
+    dp.callback_query.register(callbacks.dispatch, callbacks.filter)
+    # Имя обработчика известно только после фильтров — во внутренних middleware
+    for observer in (dp.message, dp.callback_query):
+        observer.middleware(HandlerNameMiddleware())
+        observer.middleware(HandlerMetricsMiddleware())
+    register_runtime_gauges(scheduler, engine.pool, storage, bot.session)
 
 
 async def main():
+    setup_logging(settings.log)
     logger.info("Старт бота...")
 
-    # Регистрируем роутеры
-    dp.include_router(start.router)
-    dp.include_router(workouts.router)
-    dp.include_router(exercises.router)
-
+    setup_dispatcher()
     dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
 
     # Запускаем бота
-    await dp.start_polling(
-        bot,
-        allowed_updates=dp.resolve_used_update_types(),
-    )
+    allowed_updates = routers.allowed_updates(dp)
+    if settings.tg.use_webhook:
+        await run_webhook(dp, bot, allowed_updates=allowed_updates)
+    else:
+        # Webhook, оставшийся от другого режима, мешает long polling
+        await bot.delete_webhook()
+        await dp.start_polling(
+            bot,
+            allowed_updates=allowed_updates,
+        )
 
 
 if __name__ == "__main__":
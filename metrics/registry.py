@@ -0,0 +1,140 @@
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+# Границы корзин задержки обработчика, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+GaugeValue = Union[float, Dict[str, float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными корзинами: наблюдение — поиск корзины и два сложения.
+    Накопительные суммы по корзинам считаются только при выдаче метрик.
+    """
+
+    def __init__(self, name: str, documentation: str, label: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = tuple(buckets)
+        # значение метки -> [счётчики корзин (+ последняя для +Inf), сумма]
+        self._series: Dict[str, List] = {}
+
+    def observe(self, label_value: str, value: float) -> None:
+        series = self._series.get(label_value)
+        if series is None:
+            series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_value, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels((self.label, 'le'), (label_value, le))} {cumulative}")
+            label = _labels((self.label,), (label_value,))
+            lines.append(f"{self.name}_sum{label} {total}")
+            lines.append(f"{self.name}_count{label} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Gauge:
+    """
+    Значение читается функцией в момент выдачи метрик — на горячем пути ничего не делается.
+    Функция возвращает число или словарь «значение метки -> число».
+    """
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], GaugeValue], label: Optional[str] = None):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        self.label = label
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        value = self.read()
+        if isinstance(value, dict):
+            for label_value, item in sorted(value.items()):
+                lines.append(f"{self.name}{_labels((self.label,), (label_value,))} {item}")
+        else:
+            lines.append(f"{self.name} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Union[Histogram, Counter, Gauge]] = {}
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, documentation: str, label: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, label, buckets))
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str]) -> Counter:
+        return self._add(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, read: Callable[[], GaugeValue], label: Optional[str] = None) -> Gauge:
+        return self._add(Gauge(name, documentation, read, label))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+handler_latency = registry.histogram(
+    "gymstars_handler_duration_seconds", "Время выполнения обработчика", label="handler"
+)
+handler_errors = registry.counter(
+    "gymstars_handler_errors_total", "Исключения в обработчиках", labels=("handler", "error")
+)
+fsm_transitions = registry.counter(
+    "gymstars_fsm_transitions_total", "Переходы состояний FSM", labels=("handler", "from_state", "to_state")
+)
+api_wait = registry.histogram(
+    "gymstars_api_wait_seconds", "Ожидание в очереди лимита перед запросом к Bot API", label="method"
+)
+api_retries = registry.counter(
+    "gymstars_api_retry_after_total", "Ответы 429 от Bot API", labels=("method",)
+)
+edits_skipped = registry.counter(
+    "gymstars_edits_skipped_total", "Редактирования сообщений без изменений, не отправленные в Bot API", labels=()
+)
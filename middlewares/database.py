@@ -0,0 +1,78 @@
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.session import AsyncSessionLocal
+
+# Счётчики по всем апдейтам с момента старта
+stats = {"updates": 0, "updates_with_db": 0, "checkouts": 0}
+# Сессия апдейта, который сейчас обрабатывается в этой задаче
+_current_session: ContextVar[Optional[AsyncSession]] = ContextVar("update_db_session", default=None)
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Передаёт обработчикам сессию БД в аргументе session.
+
+    Сессия ленивая: соединение берётся из пула только при первом запросе,
+    поэтому обработчики, не обращающиеся к БД, пул не трогают. Открытая
+    транзакция коммитится перед первым запросом к Bot API (см.
+    CommitBeforeRequestMiddleware) и в конце обработки апдейта; при
+    исключении — откат.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with AsyncSessionLocal() as session:
+            data["session"] = session
+            token = _current_session.set(session)
+            try:
+                result = await handler(event, data)
+                if session.in_transaction():
+                    await session.commit()
+                return result
+            except Exception:
+                if session.in_transaction():
+                    await session.rollback()
+                raise
+            finally:
+                _current_session.reset(token)
+                checkouts = session.info.get("checkouts", 0)
+                stats["updates"] += 1
+                stats["checkouts"] += checkouts
+                if checkouts:
+                    stats["updates_with_db"] += 1
+                if checkouts > 1:
+                    logger.debug("Апдейт взял соединение из пула {} раз(а)", checkouts)
+
+
+class CommitBeforeRequestMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сессии Bot API: перед отправкой запроса коммитит транзакцию
+    апдейта, если она открыта.
+
+    Ответ пользователю уходит только после того, как данные записаны: при
+    ошибке коммита обработчик падает до отправки, и сообщения об успехе не
+    будет. Соединение и блокировки строк (upsert в log_sets) не держатся,
+    пока запрос ждёт сеть, лимит RateLimitedSession или retry_after.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        session = _current_session.get()
+        if session is not None and session.in_transaction():
+            await session.commit()
+        return await make_request(bot, method)
@@ -0,0 +1,36 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from metrics.registry import fsm_transitions, handler_errors, handler_latency
+from middlewares.query_stats import resolve_handler_name
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware: время выполнения, исключения и переходы FSM по обработчикам.
+    Состояние до вызова берётся из raw_state, который уже прочитал FSM-middleware aiogram,
+    после — одно чтение из хранилища в памяти.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = resolve_handler_name(data)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            handler_errors.inc(name, type(e).__name__)
+            raise
+        finally:
+            handler_latency.observe(name, time.perf_counter() - started)
+            state = data.get("state")
+            if state is not None:
+                before = data.get("raw_state")
+                after = await state.get_state()
+                if after != before:
+                    fsm_transitions.inc(name, before or "-", after or "-")
@@ -0,0 +1,70 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from loguru import logger
+from database import query_stats
+
+
+def resolve_handler_name(data: Dict[str, Any]) -> str:
+    """
+    Имя обработчика апдейта вида «модуль.функция» без префикса handlers.
+    Доступно во внутренних middleware, когда обработчик уже выбран фильтрами.
+    """
+    # Для callback_data, разобранной CallbackRouter, — обработчик маршрута, а не общий dispatch
+    handler = data.get("callback_route") or data.get("handler")
+    callback = getattr(handler, "callback", None)
+    if callback is None:
+        return "-"
+    module = getattr(callback, "__module__", "").removeprefix("handlers.")
+    return f"{module}.{getattr(callback, '__qualname__', repr(callback))}"
+
+
+class QueryStatsMiddleware(BaseMiddleware):
+    """
+    Считает запросы к БД за время обработки апдейта, включая коммит.
+    Регистрируется внешним middleware на dp.update до DbSessionMiddleware.
+    Апдейты сверх бюджета запросов или с повторяющимся запросом логируются
+    предупреждением с именем обработчика.
+    """
+
+    def __init__(self, budget: int, repeat_limit: int):
+        self.budget = budget
+        self.repeat_limit = repeat_limit
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        stats = query_stats.begin_update()
+        flagged = False
+        try:
+            return await handler(event, data)
+        finally:
+            update_id = event.update_id if isinstance(event, Update) else "-"
+            summary = "Апдейт {} ({}): запросов {}, строк {}, БД {:.1f} мс"
+            summary_args = (update_id, stats.handler or "-", stats.statements, stats.rows, stats.db_time * 1000)
+            shape, repeats = stats.most_repeated()
+            if stats.statements > self.budget:
+                flagged = True
+                logger.warning(summary + " — больше бюджета {}", *summary_args, self.budget)
+            if repeats >= self.repeat_limit:
+                flagged = True
+                logger.warning(summary + " — запрос повторён {} раз (N+1?): {}", *summary_args, repeats, shape[:300])
+            if not flagged and stats.statements:
+                logger.debug(summary, *summary_args)
+            query_stats.end_update(stats, flagged)
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    # Внутренний middleware: помечает статистику апдейта именем выбранного обработчика
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        query_stats.set_handler(resolve_handler_name(data))
+        return await handler(event, data)
@@ -0,0 +1,68 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Dict, List
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+
+
+class UpdateScheduler(BaseEventIsolation):
+    """
+    Планировщик апдейтов перед обработчиками.
+
+    Апдейты одного чата выполняются строго по очереди (FIFO), разные чаты —
+    параллельно, но не больше max_concurrency одновременно. Передаётся в
+    Dispatcher(events_isolation=...): FSMContextMiddleware aiogram берёт
+    блокировку раньше всех наших middleware и читает состояние FSM уже под
+    ней, поэтому следующий апдейт чата видит состояние, оставленное
+    предыдущим, а сессия БД открывается после ожидания очереди.
+
+    Порядок гарантируется тем, что polling и webhook запускают обработку
+    апдейтов в порядке поступления, а asyncio.Lock будит ожидающих по FIFO.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # chat_id -> [блокировка, число апдейтов чата в работе и в очереди]
+        self._chats: Dict[int, List] = {}
+        self.active = 0
+        self.waiting = 0
+        self.processed = 0
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        entry = self._chats.get(key.chat_id)
+        if entry is None:
+            entry = self._chats[key.chat_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+
+        self.waiting += 1
+        waiting = True
+        try:
+            async with entry[0]:
+                async with self._semaphore:
+                    self.waiting -= 1
+                    waiting = False
+                    self.active += 1
+                    try:
+                        yield
+                    finally:
+                        self.active -= 1
+                        self.processed += 1
+        finally:
+            if waiting:
+                self.waiting -= 1
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._chats[key.chat_id]
+
+    async def close(self) -> None:
+        self._chats.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "chats": len(self._chats),
+            "max_chat_depth": max((entry[1] for entry in self._chats.values()), default=0),
+            "processed": self.processed,
+        }
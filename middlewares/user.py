@@ -0,0 +1,33 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+from loguru import logger
+from crud.user import add_user
+
+
+class UserRegistrationMiddleware(BaseMiddleware):
+    """
+    Регистрирует пользователя при первом обращении к боту любым апдейтом
+    и передаёт обработчикам признак is_new_user. Регистрируется после
+    DbSessionMiddleware: запись идёт в той же сессии, что и обработка апдейта.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        is_new_user = False
+        if user is not None:
+            is_new_user = await add_user(
+                session=data["session"],
+                id=user.id,
+                username=user.username,
+                full_name=user.full_name
+            )
+            if is_new_user:
+                logger.info("✅ Новый пользователь {} добавлен в БД.", user.id)
+        data["is_new_user"] = is_new_user
+        return await handler(event, data)
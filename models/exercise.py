@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from models.annotated import str_30
@@ -10,10 +10,17 @@ from models.workout_exercise import WorkoutExercise
 
 class Exercise(Base):
     __tablename__ = "exercises"
+    __table_args__ = (
+        Index("ix_exercises_user_id_type_name", "user_id", "type", "name"),
+        Index("ix_exercises_is_default", "is_default"),
+        # Стабильный ключ упражнения по умолчанию, у пользовательских — NULL
+        Index("uq_exercises_slug", "slug", unique=True),
+    )
 
     name: Mapped[str_30]
     type: Mapped[ExerciseType]
     is_default: Mapped[bool] = mapped_column(default=False)
+    slug: Mapped[Optional[str]] = mapped_column(nullable=True)
     user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
 
     owner: Mapped["User"] = relationship(back_populates="exercises")
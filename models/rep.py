@@ -1,10 +1,13 @@
-from sqlalchemy import ForeignKey, Integer, Float
+from sqlalchemy import ForeignKey, Integer, Float, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from models.base import Base
 
 
 class Rep(Base):
     __tablename__ = "reps"
+    __table_args__ = (
+        Index("ix_reps_workout_exercise_id", "workout_exercise_id"),
+    )
 
     weight: Mapped[float | None] = mapped_column(nullable=True)  # для силовых
     count: Mapped[int | None] = mapped_column(nullable=True)     # для силовых
@@ -1,5 +1,5 @@
 import datetime
-from sqlalchemy import ForeignKey, Date
+from sqlalchemy import ForeignKey, Date, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import List, Optional
 
@@ -9,10 +9,16 @@ from models.workout_exercise import WorkoutExercise
 
 class Workout(Base):
     __tablename__ = "workouts"
+    __table_args__ = (
+        # Одна тренировка на пользователя в день
+        Index("uq_workouts_user_id_date", "user_id", "date", unique=True),
+    )
 
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
     date: Mapped[datetime.date] = mapped_column(Date, nullable=False)
     comment: Mapped[Optional[str]]
+    # Растёт при каждом изменении тренировки — по нему сверяется закэшированное представление
+    version: Mapped[int] = mapped_column(default=0, server_default="0")
 
     user: Mapped["User"] = relationship(back_populates="workouts")
     exercises: Mapped[List["WorkoutExercise"]] = relationship(back_populates="workout", cascade="all, delete")
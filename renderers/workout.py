@@ -0,0 +1,89 @@
+from typing import Dict, List, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from cache.lru import LRUCache
+from database.session import after_commit
+
+# Предел длины текста сообщения Telegram, считается в единицах UTF-16
+MESSAGE_LIMIT = 4096
+
+# (id тренировки, версия) -> готовые части текста. Любое изменение тренировки
+# поднимает версию, поэтому устаревшие записи просто вытесняются. Запись
+# появляется только после коммита: номер версии из откаченной транзакции
+# достанется другим данным и не должен попасть в кэш.
+_rendered = LRUCache(maxsize=1024)
+
+
+def _length(line: str) -> int:
+    # Эмодзи вне BMP занимают две единицы UTF-16
+    return len(line.encode("utf-16-le")) // 2
+
+
+def _exercise_lines(exercise: Dict) -> List[str]:
+    is_cardio = exercise["type"] == "CARDIO"
+    lines = ["", f"🔹 {exercise['name']} ({exercise['type']})"]
+    if not exercise["reps"]:
+        lines.append("Время не указано" if is_cardio else "Нет записанных подходов")
+    elif is_cardio:
+        lines.append("Время:")
+        lines.extend(f"⏱ {rep['duration'] or 0} мин" for rep in exercise["reps"])
+    else:
+        lines.append("Подходы:")
+        lines.extend(f"💪 {rep['weight']}кг x {rep['count']}" for rep in exercise["reps"])
+    return lines
+
+
+def split_lines(lines: List[str], continuation: str, limit: int = MESSAGE_LIMIT) -> Tuple[str, ...]:
+    """
+    Склеивает строки в сообщения не длиннее limit, разрывая только между строками.
+    Каждое следующее сообщение начинается со строки continuation.
+    Строка, которая не помещается даже в пустое сообщение, режется по длине.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in lines:
+        line_size = _length(line)
+        if current and size + 1 + line_size > limit:
+            chunks.append("\n".join(current))
+            current, size = [continuation], _length(continuation)
+        while size + 1 + line_size > limit:
+            # Отрезаем кусок по символам с запасом под суррогатные пары
+            room = max(1, (limit - size - 1) // 2)
+            current.append(line[:room])
+            chunks.append("\n".join(current))
+            current, size = [continuation], _length(continuation)
+            line = line[room:]
+            line_size = _length(line)
+        current.append(line)
+        size += (1 if len(current) > 1 else 0) + line_size
+    if current:
+        chunks.append("\n".join(current))
+    return tuple(chunks)
+
+
+def render_workout(details: Dict, session: AsyncSession) -> Tuple[str, ...]:
+    """
+    Текст тренировки в формате get_workout_details, разбитый на сообщения.
+    Результат кэшируется по id и версии тренировки после коммита сессии,
+    в которой прочитано или изменено представление.
+    """
+    key = (details["id"], details["version"])
+    chunks = _rendered.get(key)
+    if chunks is not None:
+        return chunks
+
+    date = details["date"].strftime("%d.%m.%Y")
+    lines = [f"Тренировка на {date}", f"Заметка: {details['note'] or '-'}", "", "Упражнения:"]
+    for exercise in details["exercises"]:
+        lines.extend(_exercise_lines(exercise))
+
+    chunks = split_lines(lines, continuation=f"Тренировка на {date} (продолжение)")
+    if session.in_transaction():
+        after_commit(session, lambda: _rendered.set(key, chunks))
+    else:
+        _rendered.set(key, chunks)
+    return chunks
+
+
+def get_cache_stats() -> Dict[str, int]:
+    return {"hits": _rendered.hits, "misses": _rendered.misses, "size": len(_rendered)}
@@ -0,0 +1,223 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import fields
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from loguru import logger
+
+SNAPSHOT_VERSION = 1
+_KEY_FIELDS = [f.name for f in fields(StorageKey)]
+
+
+def _default(value: Any) -> Any:
+    # Даты кладём порядковым номером дня — короче ISO-строки
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$d": value.toordinal()}
+    raise TypeError(f"Тип {type(value).__name__} не поддерживается в данных FSM")
+
+
+def _object_hook(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1:
+        if "$d" in obj:
+            return date.fromordinal(obj["$d"])
+        if "$dt" in obj:
+            return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+def encode_data(data: Dict[str, Any]) -> Optional[bytes]:
+    """
+    Компактное представление данных состояния. Пустые данные не храним вовсе.
+    """
+    if not data:
+        return None
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=_default).encode()
+
+
+def decode_data(raw: Optional[bytes]) -> Dict[str, Any]:
+    if raw is None:
+        return {}
+    return json.loads(raw, object_hook=_object_hook)
+
+
+class _Record:
+    __slots__ = ("state", "data", "expires_at")
+
+    def __init__(self, state: Optional[str], data: Optional[bytes], expires_at: float):
+        self.state = state
+        self.data = data
+        self.expires_at = expires_at
+
+
+class ShardedMemoryStorage(BaseStorage):
+    """
+    FSM-хранилище в памяти процесса с ограниченным размером.
+
+    Ключи разложены по шардам, в каждом шарде — LRU с TTL: запись живёт ttl
+    секунд с последнего обращения, при переполнении вытесняется самая давняя.
+    Записи без состояния и данных удаляются сразу. Хранилище периодически
+    сохраняется в файл и читается обратно при старте, чтобы деплой не
+    сбрасывал начатые пользователями сценарии.
+    """
+
+    def __init__(
+        self,
+        max_keys: int = 100_000,
+        shards: int = 16,
+        ttl: float = 86_400,
+        snapshot_path: Optional[str] = None,
+        snapshot_interval: float = 60,
+    ):
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._shard_size = max(1, max_keys // shards)
+        self._shards: List[OrderedDict] = [OrderedDict() for _ in range(shards)]
+        self._snapshot_task: Optional[asyncio.Task] = None
+
+    def _shard(self, key: StorageKey) -> OrderedDict:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _get(self, key: StorageKey) -> Optional[_Record]:
+        shard = self._shard(key)
+        record = shard.get(key)
+        if record is None:
+            return None
+        now = time.monotonic()
+        if record.expires_at <= now:
+            del shard[key]
+            return None
+        record.expires_at = now + self.ttl
+        shard.move_to_end(key)
+        return record
+
+    def _put(self, key: StorageKey, state: Optional[str], data: Optional[bytes]) -> None:
+        shard = self._shard(key)
+        if state is None and data is None:
+            shard.pop(key, None)
+            return
+
+        now = time.monotonic()
+        shard[key] = _Record(state, data, now + self.ttl)
+        shard.move_to_end(key)
+
+        # В начале шарда — самые давние записи: сначала выкидываем протухшие, затем лишние
+        while shard:
+            oldest_key, oldest = next(iter(shard.items()))
+            if oldest.expires_at > now and len(shard) <= self._shard_size:
+                break
+            del shard[oldest_key]
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        record = self._get(key)
+        self._put(key, state, record.data if record else None)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = self._get(key)
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = self._get(key)
+        self._put(key, record.state if record else None, encode_data(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = self._get(key)
+        return decode_data(record.data) if record else {}
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    # --- Снимки на диск
+
+    def _dump(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        records = []
+        for shard in self._shards:
+            for key, record in shard.items():
+                ttl_left = record.expires_at - now
+                if ttl_left <= 0:
+                    continue
+                records.append([
+                    [getattr(key, name) for name in _KEY_FIELDS],
+                    record.state,
+                    record.data.decode() if record.data is not None else None,
+                    round(ttl_left, 1),
+                ])
+        return {"version": SNAPSHOT_VERSION, "saved_at": time.time(), "records": records}
+
+    @staticmethod
+    def _write(path: str, payload: Dict[str, Any]) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"), ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    async def save_snapshot(self) -> None:
+        if not self.snapshot_path:
+            return
+        payload = self._dump()
+        await asyncio.to_thread(self._write, self.snapshot_path, payload)
+        logger.debug("Снимок FSM сохранён: {} записей", len(payload['records']))
+
+    async def load_snapshot(self) -> None:
+        if not self.snapshot_path:
+            return
+        try:
+            payload = await asyncio.to_thread(self._read, self.snapshot_path)
+        except (OSError, ValueError) as e:
+            logger.error("Не удалось прочитать снимок FSM {}: {}", self.snapshot_path, e)
+            return
+        if not payload or payload.get("version") != SNAPSHOT_VERSION:
+            return
+
+        # Время простоя тоже засчитываем в TTL
+        downtime = max(0.0, time.time() - payload["saved_at"])
+        now = time.monotonic()
+        loaded = 0
+        for key_values, state, data, ttl_left in payload["records"]:
+            ttl_left -= downtime
+            if ttl_left <= 0:
+                continue
+            key = StorageKey(**dict(zip(_KEY_FIELDS, key_values)))
+            self._put(key, state, data.encode() if data is not None else None)
+            self._shard(key)[key].expires_at = now + min(ttl_left, self.ttl)
+            loaded += 1
+        logger.info("Восстановлено состояний FSM из снимка: {}", loaded)
+
+    async def _snapshot_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.save_snapshot()
+            except OSError as e:
+                logger.error("Не удалось сохранить снимок FSM: {}", e)
+
+    def start_snapshots(self) -> None:
+        if self.snapshot_path and self.snapshot_interval > 0 and self._snapshot_task is None:
+            self._snapshot_task = asyncio.create_task(self._snapshot_forever())
+
+    async def close(self) -> None:
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            try:
+                await self._snapshot_task
+            except asyncio.CancelledError:
+                pass
+            self._snapshot_task = None
+        await self.save_snapshot()
@@ -0,0 +1,51 @@
+import asyncio
+import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from crud.workout import create_workout
+from handlers.workouts import add_workout_save
+from schemas.workout import WorkoutCreateSchema
+
+
+class FakeSession:
+    """Сессия, которая запоминает запросы и отвечает заданной строкой."""
+
+    def __init__(self, row=None):
+        self.row = row
+        self.statements = []
+        self.info = {}
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = self.row
+        return result
+
+
+def test_create_workout_is_upsert_on_user_and_date():
+    session = FakeSession()
+    data = WorkoutCreateSchema(date=datetime.date(2026, 1, 2), comment="ноги")
+
+    assert asyncio.run(create_workout(session, user_id=1, data=data)) is None
+
+    sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (user_id, date) DO NOTHING" in sql
+    # Дата уже занята — кэш дат трогать нечего
+    assert "after_commit" not in session.info
+
+
+def test_add_workout_save_reports_existing_workout_on_duplicate_date():
+    session = FakeSession()
+    state = AsyncMock()
+    state.get_data.return_value = {"date": datetime.date(2026, 1, 2), "note": None}
+    message = MagicMock()
+    message.from_user.id = 1
+    message.answer = AsyncMock()
+
+    asyncio.run(add_workout_save(message, state, session))
+
+    state.clear.assert_awaited_once()
+    text = message.answer.await_args.args[0]
+    assert text.startswith("На 02.01.2026 уже есть тренировка")
@@ -0,0 +1,81 @@
+from typing import Optional
+from aiohttp import web
+from loguru import logger
+from cache import exercise_catalog
+from client import edit
+from client.session import RateLimitedSession
+from database import query_stats
+from database.pool import TimedAsyncAdaptedQueuePool
+from keyboards import calendar
+from metrics.registry import registry
+from middlewares import database
+from middlewares.scheduler import UpdateScheduler
+from renderers import workout
+from storage.memory import ShardedMemoryStorage
+
+_runner: Optional[web.AppRunner] = None
+
+
+def register_runtime_gauges(
+    scheduler: UpdateScheduler,
+    pool: TimedAsyncAdaptedQueuePool,
+    storage: ShardedMemoryStorage,
+    api_session: RateLimitedSession,
+) -> None:
+    # Состояние компонентов читается только в момент запроса метрик
+    registry.gauge("gymstars_scheduler", "Планировщик апдейтов", scheduler.stats, label="stat")
+    registry.gauge("gymstars_api_queue", "Очередь исходящих запросов к Bot API", api_session.stats, label="stat")
+    registry.gauge(
+        "gymstars_db_pool",
+        "Соединения пула БД",
+        lambda: {
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "size": pool.size(),
+            "overflow": pool.overflow(),
+        },
+        label="stat",
+    )
+    registry.gauge("gymstars_db_sessions", "Апдейты и выдачи соединений с момента старта", lambda: database.stats, label="stat")
+    registry.gauge(
+        "gymstars_db_statements",
+        "Запросы к БД по обработчикам с момента старта",
+        lambda: {name: totals.statements for name, totals in query_stats.handler_totals.items()},
+        label="handler",
+    )
+    registry.gauge("gymstars_fsm_keys", "Записей в хранилище FSM", lambda: len(storage))
+
+    caches = {
+        "calendar": calendar.get_cache_stats,
+        "exercise_catalog": exercise_catalog.get_cache_stats,
+        "message_render": edit.get_cache_stats,
+        "workout_text": workout.get_cache_stats,
+    }
+    for stat in ("hits", "misses", "size"):
+        registry.gauge(
+            f"gymstars_cache_{stat}",
+            f"Кэши в памяти: {stat}",
+            lambda stat=stat: {name: read()[stat] for name, read in caches.items()},
+            label="cache",
+        )
+
+
+async def _handle(request: web.Request) -> web.Response:
+    return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+
+async def start_metrics_server(host: str, port: int) -> None:
+    global _runner
+    app = web.Application()
+    app.router.add_get("/metrics", _handle)
+    _runner = web.AppRunner(app)
+    await _runner.setup()
+    await web.TCPSite(_runner, host, port).start()
+    logger.info("Метрики доступны на http://{}:{}/metrics", host, port)
+
+
+async def stop_metrics_server() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
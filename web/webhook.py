@@ -0,0 +1,99 @@
+import asyncio
+from typing import List, Set
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import setup_application
+from aiohttp import web
+from loguru import logger
+from pydantic import ValidationError
+from config.main_conf import settings
+
+
+class WebhookServer:
+    """
+    Принимает апдейты от Telegram и сразу отвечает 200, обработка идёт в фоне.
+    Порядок внутри чата и общий предел параллельности обеспечивает
+    UpdateScheduler, здесь ограничивается только число принятых, но ещё не
+    обработанных апдейтов. Сверх предела отвечаем 503 — Telegram повторит
+    доставку позже, апдейт не теряется.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, queue_size: int, allowed_updates: List[str], secret: str = ""):
+        self.dp = dp
+        self.bot = bot
+        self.allowed_updates = allowed_updates
+        self.queue_size = queue_size
+        self.secret = secret
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.secret and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != self.secret:
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except (ValueError, ValidationError) as e:
+            logger.warning("Некорректный апдейт в webhook: {}", e)
+            return web.Response(status=400)
+
+        if len(self._tasks) >= self.queue_size:
+            logger.warning("Очередь апдейтов переполнена, апдейт {} отклонён.", update.update_id)
+            return web.Response(status=503)
+
+        # Задачи стартуют в порядке создания, то есть в порядке поступления апдейтов
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response()
+
+    async def _process(self, update: Update) -> None:
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception as e:
+            logger.exception("Ошибка обработки апдейта {}: {}", update.update_id, e)
+
+    async def on_startup(self, app: web.Application) -> None:
+        await self.bot.set_webhook(
+            url=settings.tg.webhook_base_url.rstrip("/") + settings.tg.webhook_path,
+            secret_token=self.secret or None,
+            allowed_updates=self.allowed_updates,
+        )
+        logger.info("Webhook установлен.")
+
+    async def on_shutdown(self, app: web.Application) -> None:
+        # Даём дообработать уже принятые апдейты
+        if self._tasks:
+            _, pending = await asyncio.wait(set(self._tasks), timeout=10)
+            if pending:
+                logger.warning("Не дождались обработки {} апдейтов при остановке.", len(pending))
+                for task in pending:
+                    task.cancel()
+        await self.bot.session.close()
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, allowed_updates: List[str]) -> None:
+    server = WebhookServer(
+        dp,
+        bot,
+        queue_size=settings.tg.webhook_queue_size,
+        allowed_updates=allowed_updates,
+        secret=settings.tg.webhook_secret.get_secret_value(),
+    )
+
+    app = web.Application()
+    app.router.add_post(settings.tg.webhook_path, server.handle)
+    # Порядок важен: при остановке сначала дообрабатываем очередь, затем
+    # shutdown диспетчера закрывает БД и хранилище; при старте — наоборот.
+    app.on_shutdown.append(server.on_shutdown)
+    setup_application(app, dp, bot=bot)
+    app.on_startup.append(server.on_startup)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.tg.webapp_host, settings.tg.webapp_port)
+    await site.start()
+    logger.info("Webhook-сервер слушает {}:{}", settings.tg.webapp_host, settings.tg.webapp_port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()